@@ -0,0 +1,27 @@
+from asgiref.sync import sync_to_async
+
+
+def async_read_view(viewset, actions, async_actions, **initkwargs):
+    """Асинхронный view для ASGI поверх обычного ViewSet.
+
+    GET обрабатывается async-методом из async_actions, например
+    {'get': 'alist'}: viewset создаётся обычным as_view(), а
+    AsyncReadModelMixin.dispatch() возвращает корутину. Остальные
+    методы и запись идут в синхронный view без изменений.
+    """
+    sync_view = sync_to_async(viewset.as_view(dict(actions), **initkwargs))
+    async_view = viewset.as_view(
+        dict(actions), async_actions=async_actions, **initkwargs
+    )
+
+    async def view(request, *args, **kwargs):
+        if request.method.lower() not in async_actions:
+            return await sync_view(request, *args, **kwargs)
+        return await async_view(request, *args, **kwargs)
+
+    # csrf_exempt() в Django 4.2 превращает корутину в синхронный view.
+    view.csrf_exempt = True
+    view.cls = viewset
+    view.initkwargs = initkwargs
+    view.actions = actions
+    return view
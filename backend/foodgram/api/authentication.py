@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.caches import is_shared_cache
+
+User = get_user_model()
+
+# Порядок полей модели: его ждёт Model.from_db().
+USER_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'is_active', 'is_staff', 'is_superuser',
+    }
+)
+
+
+def get_cache_key(key):
+    return f'auth_token_{key}'
+
+
+class LocalCache:
+    """LRU в памяти процесса с временем жизни записей."""
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        if not timeout:
+            return
+        with self.lock:
+            self.items[key] = (value, monotonic() + timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+local_tokens = LocalCache(settings.AUTH_TOKEN_LOCAL_CACHE_SIZE)
+
+
+def load_user_values(key):
+    values = Token.objects.using(DEFAULT_DB_ALIAS).filter(key=key).values_list(
+        *(f'user__{field}' for field in USER_FIELDS)
+    ).first()
+    if values is None:
+        return None
+    return dict(zip(USER_FIELDS, values))
+
+
+def get_user_values(key):
+    """Поля пользователя по ключу токена: процесс, общий кэш, база."""
+    values = local_tokens.get(key)
+    if values is None:
+        values = cache.get(get_cache_key(key))
+        if values is None:
+            values = load_user_values(key)
+            if values is None:
+                return None
+            cache.set(
+                get_cache_key(key), values,
+                settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+        local_tokens.set(
+            key, values, settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT
+        )
+    return values
+
+
+def invalidate_tokens(keys):
+    keys = list(keys)
+    local_tokens.delete(keys)
+    cache.delete_many([get_cache_key(key) for key in keys])
+
+
+def get_user_token_keys(user_id):
+    return list(Token.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id
+    ).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе на чтениях.
+
+    На безопасных запросах пользователь собирается из закэшированных
+    полей USER_FIELDS. Такой объект нельзя сохранять, поэтому
+    запросы на запись и работа без общего кэша читают пользователя
+    из базы, как обычный TokenAuthentication.
+    """
+
+    def authenticate(self, request):
+        self.use_cache = (
+            request.method in SAFE_METHODS and is_shared_cache()
+        )
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        if not self.use_cache:
+            return self.load_credentials(key)
+        values = get_user_values(key)
+        if values is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user = User.from_db(
+            DEFAULT_DB_ALIAS, USER_FIELDS,
+            [values[field] for field in USER_FIELDS]
+        )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, Token(key=key, user=user)
+
+    def load_credentials(self, key):
+        try:
+            token = Token.objects.using(DEFAULT_DB_ALIAS).select_related(
+                'user'
+            ).get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return token.user, token
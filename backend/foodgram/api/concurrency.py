@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, connections
+
+from .middleware import track_queries
+
+query_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_QUERY_WORKERS,
+    thread_name_prefix='async-query',
+)
+
+
+POOLED_ENGINE = 'foodgram.db_pool'
+
+
+def close_connections(pooled_only=False):
+    for conn in connections.all(initialized_only=True):
+        if not pooled_only or conn.settings_dict['ENGINE'] == POOLED_ENGINE:
+            conn.close()
+
+
+def run_on_query_thread(func, *args):
+    """Обычное соединение потока остаётся открытым для следующих вызовов,
+    соединение из foodgram.db_pool после вызова возвращается в пул:
+    иначе каждый поток навсегда занял бы по соединению пула.
+
+    Если соединение закрыла база, оно открывается заново и вызов
+    повторяется: сюда попадает только чтение.
+    """
+    with ExitStack() as stack:
+        track_queries(stack)
+        stack.callback(close_connections, pooled_only=True)
+        try:
+            return func(*args)
+        except (InterfaceError, OperationalError):
+            close_connections()
+            return func(*args)
+
+
+def in_thread(func, *args):
+    """Запускает синхронный ORM-код в отдельном потоке.
+
+    Потоки query_executor держат по своему соединению или берут его
+    из пула, поэтому независимые запросы одного ответа идут
+    параллельно без нового подключения на каждый. SQLite всё равно
+    сериализует запросы, поэтому для неё код идёт в общий поток запроса.
+    """
+    if connection.vendor == 'sqlite':
+        return sync_to_async(func)(*args)
+    return sync_to_async(
+        run_on_query_thread, thread_sensitive=False, executor=query_executor
+    )(func, *args)
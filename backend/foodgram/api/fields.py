@@ -0,0 +1,56 @@
+import filetype
+from django.conf import settings
+from drf_extra_fields.fields import Base64FileField, Base64ImageField
+from rest_framework import serializers
+
+from recipes.images import RENDITION_FORMATS
+
+
+class Base64RecipeImageField(Base64FileField):
+    """Картинка в base64, которую не декодируют в запросе.
+
+    Тип определяется по сигнатуре файла, а декодирование и пересжатие
+    выполняет фоновый обработчик из recipes.images.
+    """
+    ALLOWED_TYPES = Base64ImageField.ALLOWED_TYPES
+    INVALID_FILE_MESSAGE = Base64ImageField.INVALID_FILE_MESSAGE
+    INVALID_TYPE_MESSAGE = Base64ImageField.INVALID_TYPE_MESSAGE
+
+    def get_file_extension(self, filename, decoded_file):
+        extension = filetype.guess_extension(decoded_file)
+        return 'jpg' if extension == 'jpeg' else extension
+
+
+class ImageVariantsField(serializers.Field):
+    """Ссылки на готовые варианты картинки рецепта по их названиям."""
+
+    def __init__(self, variants, **kwargs):
+        self.variants = variants
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', '*')
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        storage = recipe.image.storage
+        urls = {}
+        for variant in self.variants:
+            name = recipe.image_renditions.get(variant)
+            if name:
+                url = storage.url(name)
+                urls[variant] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return urls
+
+
+class ImageRenditionsField(ImageVariantsField):
+
+    def __init__(self, **kwargs):
+        super().__init__(tuple(RENDITION_FORMATS), **kwargs)
+
+
+class ThumbnailsField(ImageVariantsField):
+
+    def __init__(self, **kwargs):
+        super().__init__(tuple(settings.RECIPE_THUMBNAILS), **kwargs)
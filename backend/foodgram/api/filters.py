@@ -1,23 +1,20 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.settings import api_settings
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from recipes.reference import get_reference_data
 
 User = get_user_model()
 
 
-class IngredientsFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
-
-
 class RecipesFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=lambda: [
+            (tag.slug, tag.name) for tag in get_reference_data().tag_list
+        ],
+        method='get_tags',
     )
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all(),
@@ -33,14 +30,44 @@ class RecipesFilter(FilterSet):
         model = Recipe
         fields = ['is_favorited', 'author', 'tags', 'is_in_shopping_cart']
 
+    def get_tags(self, queryset, name, value):
+        tag_ids = [
+            tag.id for tag in get_reference_data().tag_list
+            if tag.slug in value
+        ]
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+        )))
+
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favoriterecipe__user=user)
+            return queryset.filter(Exists(FavoriteRecipe.objects.filter(
+                user=user, favorite_recipe=OuterRef('pk')
+            )))
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(recipe_shopping_cart__user=user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )))
         return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию, ингредиентам и описанию.
+
+    Без явного ?ordering= результаты сортируются по релевантности.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = queryset.search(query)
+        if OrderingFilter.ordering_param in request.query_params:
+            return queryset
+        return queryset.order_by('-rank', *Recipe._meta.ordering)
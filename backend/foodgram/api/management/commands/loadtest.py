@@ -0,0 +1,75 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Нагружает запущенный сервер GET-запросами и считает rps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Адреса для GET')
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Запросов на каждый адрес'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=10,
+            help='Одновременных соединений keep-alive'
+        )
+        parser.add_argument(
+            '--token', help='Токен для заголовка Authorization'
+        )
+
+    def handle(self, *args, urls, requests, concurrency, token, **options):
+        if requests < 2:
+            raise CommandError('Для перцентилей нужно не меньше 2 запросов')
+        if concurrency < 1:
+            raise CommandError('Нужно хотя бы одно соединение')
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        for url in urls:
+            self.run(url, requests, concurrency, headers)
+
+    def run(self, url, requests, concurrency, headers):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise CommandError(f'Нужен адрес http или https: {url}')
+        connection_class = (
+            HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        )
+        path = parts.path or '/'
+        if parts.query:
+            path += f'?{parts.query}'
+        local = threading.local()
+        errors = []
+
+        def fetch(_):
+            if not hasattr(local, 'connection'):
+                local.connection = connection_class(parts.netloc, timeout=30)
+            started = time.perf_counter()
+            try:
+                local.connection.request('GET', path, headers=headers)
+                response = local.connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+            except OSError as error:
+                errors.append(error)
+                local.connection.close()
+                del local.connection
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(fetch, range(requests)))
+        elapsed = time.perf_counter() - started
+        percentiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(self.style.SUCCESS(
+            f'{url}: {requests / elapsed:.1f} rps, '
+            f'p50 {percentiles[49] * 1000:.1f} мс, '
+            f'p95 {percentiles[94] * 1000:.1f} мс, ошибок: {len(errors)}'
+        ))
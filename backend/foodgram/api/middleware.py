@@ -0,0 +1,212 @@
+import logging
+import threading
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.metrics import current_metrics
+from foodgram.routers import read_from_replica, stick_to_primary
+
+logger = logging.getLogger(__name__)
+
+
+def track_queries(stack, metrics=None):
+    """Подключает счётчик текущего запроса к соединениям этого потока."""
+    if metrics is None:
+        metrics = current_metrics.get()
+    if metrics is not None:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+
+def get_query_budget(view_name, method):
+    budgets = settings.QUERY_BUDGETS
+    return budgets.get(
+        f'{view_name} {method}',
+        budgets.get(view_name, settings.QUERY_BUDGET_DEFAULT)
+    )
+
+
+class QueryMetrics:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.pool_wait = None
+        self.serialization = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            with self.lock:
+                self.duration += duration
+                self.count += 1
+
+    def add_pool_wait(self, wait):
+        with self.lock:
+            self.pool_wait = (self.pool_wait or 0.0) + wait
+
+    def add_serialization(self, duration):
+        with self.lock:
+            self.serialization += duration
+
+
+class RequestMetricsMiddleware:
+    """Считает запросы к БД, время SQL, сериализации, рендеринга
+    и размер ответа.
+
+    Отдаёт цифры в заголовке Server-Timing и в строке лога, а при
+    превышении бюджета запросов для представления пишет предупреждение.
+    В ASGI запросы из других потоков учитываются через current_metrics.
+    У потоковых ответов заголовок не ставится: строка лога и бюджет
+    считаются, когда тело отдано целиком, вместе с запросами генератора.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = QueryMetrics()
+        request._render_duration = 0.0
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                track_queries(stack)
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = QueryMetrics()
+        request._render_duration = 0.0
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        stack = ExitStack()
+        try:
+            await sync_to_async(track_queries)(stack)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def finish(self, request, response, metrics, start):
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.track_stream(
+                request, response, metrics, start,
+                response.streaming_content
+            )
+            return response
+        total = perf_counter() - start
+        self.add_header(request, response, metrics, total)
+        self.report(request, response, metrics, total)
+        return response
+
+    def track_stream(self, request, response, metrics, start, content):
+        try:
+            with ExitStack() as stack:
+                track_queries(stack, metrics)
+                yield from content
+        finally:
+            self.report(request, response, metrics, perf_counter() - start)
+
+    def process_template_response(self, request, response):
+        start = perf_counter()
+
+        def rendered(response):
+            request._render_duration = perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def add_header(self, request, response, metrics, total):
+        timings = [
+            f'db;dur={metrics.duration * 1000:.1f};'
+            f'desc="{metrics.count} queries"',
+            f'serialize;dur={metrics.serialization * 1000:.1f}',
+            f'render;dur={request._render_duration * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        if metrics.pool_wait is not None:
+            timings.insert(0, f'pool;dur={metrics.pool_wait * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+
+    def report(self, request, response, metrics, total):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        size = None if response.streaming else len(response.content)
+        render = request._render_duration
+        pool_wait = '-'
+        if metrics.pool_wait is not None:
+            pool_wait = f'{metrics.pool_wait * 1000:.1f}'
+        logger.info(
+            'view=%s method=%s status=%s queries=%d db_ms=%.1f '
+            'pool_ms=%s serialize_ms=%.1f render_ms=%.1f total_ms=%.1f '
+            'bytes=%s',
+            view_name, request.method, response.status_code,
+            metrics.count, metrics.duration * 1000, pool_wait,
+            metrics.serialization * 1000, render * 1000, total * 1000, size,
+        )
+        budget = get_query_budget(view_name, request.method)
+        if metrics.count > budget:
+            logger.warning(
+                'Превышен бюджет запросов: view=%s method=%s '
+                'queries=%d budget=%d path=%s',
+                view_name, request.method, metrics.count, budget,
+                request.get_full_path(),
+            )
+
+
+class ReplicaStickinessMiddleware:
+    """Сбрасывает выбор реплики после запроса и после успешной записи
+    закрепляет пользователя за основной базой."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_from_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        self.remember_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        await sync_to_async(self.remember_write)(request, response)
+        return response
+
+    def remember_write(self, request, response):
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            stick_to_primary(request, response)
@@ -1,4 +1,21 @@
+import asyncio
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date
 from rest_framework import mixins, viewsets
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from foodgram.routers import is_sticky, read_from_replica
+from recipes.reference import get_reference_data
+
+from .concurrency import in_thread
 
 
 class CreateOrDestroyViewSet(
@@ -16,3 +33,243 @@ class ListCreateDestroyViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class ReplicaReadMixin:
+    """Безопасные запросы читают с реплики.
+
+    Пользователь, который недавно что-то изменил, читает с основной
+    базы, чтобы видеть свои изменения.
+    """
+
+    def use_replica(self):
+        return True
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS and self.use_replica()
+                and not is_sticky(request)):
+            read_from_replica.set(True)
+
+
+class ReferenceDataMixin:
+    """Снимок справочников один на запрос: каждая проверка свежести
+    идёт в кэш, а без общего кэша может и перестроить снимок."""
+
+    def get_reference_data(self):
+        if not hasattr(self, 'reference_data'):
+            self.reference_data = get_reference_data()
+        return self.reference_data
+
+
+class ConditionalGetMixin:
+    """Отвечает 304, если у клиента актуальная версия list и retrieve.
+
+    Валидаторы считаются в get_validators() до сериализации:
+    части для слабого ETag и unix-время для Last-Modified.
+    """
+    vary_headers = ()
+
+    def get_validators(self):
+        return None, None
+
+    def get_etag(self, etag_parts):
+        if etag_parts is None:
+            return None
+        key = (
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            *etag_parts
+        )
+        return f'W/"{md5(repr(key).encode()).hexdigest()}"'
+
+    def check_validators(self, request, validators):
+        etag_parts, last_modified = validators
+        etag = self.get_etag(etag_parts)
+        if last_modified is not None:
+            last_modified = int(last_modified)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        return etag, last_modified, not_modified
+
+    def patch_validators(self, response, etag, last_modified):
+        if response.status_code not in (200, 304):
+            return response
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if self.vary_headers:
+            patch_vary_headers(response, self.vary_headers)
+            patch_cache_control(response, private=True)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified, response = self.check_validators(
+            request, self.get_validators()
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.patch_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, handler, request, *args, **kwargs):
+        """Без условных заголовков валидаторы считаются вместе с ответом."""
+        if ('HTTP_IF_NONE_MATCH' in request.META
+                or 'HTTP_IF_MODIFIED_SINCE' in request.META):
+            validators = await in_thread(self.get_validators)
+            etag, last_modified, response = self.check_validators(
+                request, validators
+            )
+            if response is None:
+                response = await handler(request, *args, **kwargs)
+        else:
+            validators, response = await asyncio.gather(
+                in_thread(self.get_validators),
+                handler(request, *args, **kwargs),
+            )
+            etag, last_modified, _ = self.check_validators(
+                request, validators
+            )
+        return self.patch_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            super().alist, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            super().aretrieve, request, *args, **kwargs
+        )
+
+
+class ResponseCacheMixin:
+    """Хранит готовый ответ list в кэше по ключу get_response_cache_key().
+
+    Если ключ None, ответ не кэшируется.
+    """
+    response_cache_timeout = None
+
+    def get_response_cache_key(self):
+        return None
+
+    def get_cached_response(self, key):
+        cached = cache.get(key)
+        if cached is None:
+            return None
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def cache_response(self, key, response):
+        if response.status_code != 200:
+            return
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        cache.set(
+            key, (response.content, response['Content-Type']),
+            self.response_cache_timeout
+        )
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_response_cache_key()
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        response = self.get_cached_response(key)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            self.cache_response(key, response)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        key = await sync_to_async(self.get_response_cache_key)()
+        if key is None:
+            return await super().alist(request, *args, **kwargs)
+        response = await sync_to_async(self.get_cached_response)(key)
+        if response is None:
+            response = await super().alist(request, *args, **kwargs)
+            await sync_to_async(self.cache_response)(key, response)
+        return response
+
+
+class AsyncReadModelMixin:
+    """Асинхронные alist и aretrieve для async_read_view().
+
+    Синхронные list и retrieve остаются без изменений.
+    """
+    # Методы, которые async_read_view() отдаёт async-обработчикам.
+    async_actions = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.async_actions and request.method.lower() in self.async_actions:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch() для async-обработчика: те же initial(),
+        handle_exception() и finalize_response(), но в потоке."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, self.async_actions[request.method.lower()])
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+        self.response = await sync_to_async(self.finalize_response)(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    def preload(self):
+        """Данные запроса, которые можно загрузить параллельно со страницей."""
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset()
+        )
+        page, _ = await asyncio.gather(
+            self.apaginate_queryset(queryset), in_thread(self.preload)
+        )
+        if page is not None:
+            data = await self.aserialize(page, many=True)
+            return self.get_paginated_response(data)
+        rows = await in_thread(list, queryset)
+        return Response(await self.aserialize(rows, many=True))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance, _ = await asyncio.gather(
+            sync_to_async(self.get_object)(), in_thread(self.preload)
+        )
+        return Response(await self.aserialize(instance))
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, 'apaginate_queryset'):
+            return await self.paginator.apaginate_queryset(
+                queryset, self.request, view=self
+            )
+        return await sync_to_async(self.paginate_queryset)(queryset)
+
+    async def aserialize(self, instance, many=False):
+        # Контекст сериализатора может читать кэш и базу.
+        return await sync_to_async(
+            lambda: self.get_serializer(instance, many=many).data
+        )()
@@ -0,0 +1,112 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Page
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.settings import api_settings
+
+from .concurrency import in_thread
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсор идёт в порядке представления, '-id' — только запасной."""
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        if any(
+            hasattr(backend, 'get_ordering')
+            for backend in getattr(view, 'filter_backends', ())
+        ):
+            # OrderingFilter учитывает и ?ordering=, и view.ordering.
+            return super().get_ordering(request, queryset, view)
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """Постраничная навигация, курсорная по запросу клиента.
+
+    Курсорный режим включается параметром ?pagination=cursor и
+    сохраняется в ссылках next/previous через параметр cursor.
+    Он не считает COUNT(*) и не использует OFFSET для глубоких страниц.
+    С ?search= курсор не используется: его постоянный порядок
+    перебил бы сортировку по релевантности.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_pagination_class = LimitCursorPagination
+
+    def is_cursor_request(self, request):
+        params = request.query_params
+        if params.get(api_settings.SEARCH_PARAM):
+            return False
+        return (
+            self.cursor_pagination_class.cursor_query_param in params
+            or params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.is_cursor_request(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант: COUNT(*) и строки страницы идут параллельно.
+
+        Номер страницы разбирается как в PageNumberPagination, включая
+        page=last; для last и ошибочных номеров COUNT(*) нужен заранее.
+        """
+        if self.is_cursor_request(request):
+            return await sync_to_async(self.paginate_queryset)(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            number = int(page_number)
+        except ValueError:
+            number = 0
+        if number < 1:
+            paginator.count = await in_thread(queryset.count)
+            number = self.get_page_number(request, paginator)
+            rows = None
+        else:
+            offset = (number - 1) * page_size
+            paginator.count, rows = await asyncio.gather(
+                in_thread(queryset.count),
+                in_thread(list, queryset[offset:offset + page_size]),
+            )
+        try:
+            number = paginator.validate_number(number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        if rows is None:
+            offset = (number - 1) * page_size
+            rows = await in_thread(
+                list, queryset[offset:offset + page_size]
+            )
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.page = Page(rows, number, paginator)
+        self.request = request
+        return rows
@@ -0,0 +1,118 @@
+import csv
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from rest_framework.renderers import BaseRenderer
+
+TITLE = 'Список покупок'
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Формат выгрузки списка покупок, выбирается параметром ?format=.
+
+    Подклассы отдают файл потоком через stream(ingredients). Ответы
+    с ошибками рендерит JSONRenderer: RecipeViewSet.finalize_response
+    подменяет для них выбранный рендерер.
+    """
+    charset = 'utf-8'
+
+
+class TxtShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield f'{TITLE}\n\n'
+        for name, measurement_unit, amount in ingredients:
+            yield f'{name} ({measurement_unit}) — {amount}\n'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield '\ufeff'
+        yield writer.writerow(
+            ('Ингредиент', 'Единица измерения', 'Количество')
+        )
+        for row in ingredients:
+            yield writer.writerow(row)
+
+
+class PdfShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    line_height = 7 * mm
+    margin = 20 * mm
+    spool_size = 1024 * 1024
+    chunk_size = 64 * 1024
+
+    def get_font(self):
+        if self.font_name in pdfmetrics.getRegisteredFontNames():
+            return self.font_name
+        if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+            return 'Helvetica'
+        pdfmetrics.registerFont(
+            TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT)
+        )
+        return self.font_name
+
+    def stream(self, ingredients):
+        font = self.get_font()
+        height = A4[1]
+        with SpooledTemporaryFile(max_size=self.spool_size) as buffer:
+            pdf = canvas.Canvas(buffer, pagesize=A4)
+            pdf.setTitle(TITLE)
+            page = 1
+            y = self.start_page(pdf, font, height, page)
+            for name, measurement_unit, amount in ingredients:
+                if y < self.margin:
+                    pdf.showPage()
+                    page += 1
+                    y = self.start_page(pdf, font, height, page)
+                pdf.drawString(
+                    self.margin, y, f'{name} ({measurement_unit}) — {amount}'
+                )
+                y -= self.line_height
+            pdf.save()
+            buffer.seek(0)
+            while chunk := buffer.read(self.chunk_size):
+                yield chunk
+
+    def start_page(self, pdf, font, height, page):
+        pdf.setFont(font, self.font_size)
+        pdf.drawRightString(
+            A4[0] - self.margin, self.margin / 2, str(page)
+        )
+        y = height - self.margin
+        if page == 1:
+            pdf.setFont(font, self.font_size + 4)
+            pdf.drawString(self.margin, y, TITLE)
+            pdf.setFont(font, self.font_size)
+            y -= 2 * self.line_height
+        return y
+
+
+SHOPPING_LIST_RENDERERS = (
+    TxtShoppingListRenderer,
+    CsvShoppingListRenderer,
+    PdfShoppingListRenderer,
+)
@@ -4,17 +4,31 @@ from djoser.serializers import (
     UserCreateSerializer, UserSerializer, PasswordSerializer
 )
 
-from drf_extra_fields.fields import Base64ImageField
-
 from django.contrib.auth.hashers import check_password
+from django.db import transaction
+from foodgram.metrics import serialization_timer
+from recipes.reference import get_reference_data
 from recipes.models import (
     Tag, Ingredient, Recipe,
     User, Subscription, FavoriteRecipe,
     ShoppingCart, RecipeIngredient
 )
 
+from .fields import (
+    Base64RecipeImageField, ImageRenditionsField, ThumbnailsField
+)
+from .user_flags import get_user_flags
+
+
+class TimedSerializerMixin:
+    """Время to_representation() уходит в Server-Timing как serialize."""
 
-class UserListSerializer(UserSerializer):
+    def to_representation(self, instance):
+        with serialization_timer():
+            return super().to_representation(instance)
+
+
+class UserListSerializer(TimedSerializerMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -23,11 +37,10 @@ class UserListSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        return (self.context.get('request').user.is_authenticated
-                and Subscription.objects.filter(
-                    user=self.context.get('request').user,
-                    author=obj
-        ).exists())
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in get_user_flags(
+            self.context.get('request')).subscriptions
 
 
 class UserCreateSerializer(UserCreateSerializer):
@@ -43,7 +56,7 @@ class UserCreateSerializer(UserCreateSerializer):
         )
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Tag
@@ -51,7 +64,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientsReadSerializer(serializers.ModelSerializer):
+class IngredientsReadSerializer(TimedSerializerMixin,
+                                serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
@@ -68,7 +82,8 @@ class IngredientsEditSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class FavoriteRecipeSerializer(serializers.ModelSerializer):
+class FavoriteRecipeSerializer(TimedSerializerMixin,
+                               serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='favorite_recipe.id',
     )
@@ -79,13 +94,14 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
         source='favorite_recipe.image',
         read_only=True,
     )
+    thumbnails = ThumbnailsField(source='favorite_recipe')
     cooking_time = serializers.ReadOnlyField(
         source='favorite_recipe.cooking_time',
     )
 
     class Meta:
         model = FavoriteRecipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnails', 'cooking_time')
 
     def validate(self, data):
         user = self.context.get('request').user
@@ -97,63 +113,93 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
         return data
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserListSerializer()
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = ImageRenditionsField()
+    thumbnails = ThumbnailsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author',
                   'ingredients', 'is_favorited',
                   'is_in_shopping_cart', 'name',
-                  'image', 'text', 'cooking_time')
+                  'image', 'image_renditions', 'thumbnails',
+                  'text', 'cooking_time')
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_subscribed_to_author'):
+            instance.author.is_subscribed = instance.is_subscribed_to_author
+        return super().to_representation(instance)
+
+    def get_reference_data(self):
+        context = self.context
+        if 'reference_data' not in context:
+            context['reference_data'] = get_reference_data()
+        return context['reference_data']
 
     def get_ingredients(self, obj):
-        recipe_ingredients = RecipeIngredient.objects.filter(recipe=obj)
+        reference = self.get_reference_data()
         ingredients_data = []
-        for recipe_ingredient in recipe_ingredients:
-            ingredient_data = {
-                'id': recipe_ingredient.ingredient.id,
-                'name': recipe_ingredient.ingredient.name,
-                'measurement_unit':
-                    recipe_ingredient.ingredient.measurement_unit,
+        for recipe_ingredient in obj.recipeingredient_set.all():
+            ingredient = reference.ingredients.get(
+                recipe_ingredient.ingredient_id
+            ) or recipe_ingredient.ingredient
+            ingredients_data.append({
+                'id': ingredient.id,
+                'name': ingredient.name,
+                'measurement_unit': ingredient.measurement_unit,
                 'amount': recipe_ingredient.amount,
-            }
-            ingredients_data.append(ingredient_data)
+            })
         return ingredients_data
 
     def get_is_favorited(self, obj):
-        return (
-            self.context['request'].user.is_authenticated
-            and FavoriteRecipe.objects.filter(
-                user=self.context['request'].user, favorite_recipe=obj
-            ).exists()
-        )
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return obj.id in get_user_flags(self.context['request']).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        return (
-            self.context['request'].user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user=self.context['request'].user, recipe=obj
-            ).exists()
-        )
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return obj.id in get_user_flags(
+            self.context['request']).shopping_cart
 
 
-class RecipeSubscribeReadSerializer(serializers.ModelSerializer):
+class RecipeSubscribeReadSerializer(TimedSerializerMixin,
+                                    serializers.ModelSerializer):
+    thumbnails = ThumbnailsField()
 
     class Meta:
         model = Recipe
         fields = (
-            'id', 'name', 'image', 'cooking_time'
+            'id', 'name', 'image', 'thumbnails', 'cooking_time'
         )
         read_only_fields = ('__all__',)
 
 
+class CookableRecipeSerializer(RecipeReadSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            'coverage', 'missing_ingredients'
+        )
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100
+    )
+
+
 class RecipeEditSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(
+    image = Base64RecipeImageField(
         max_length=None,
         use_url=True)
     ingredients = IngredientsEditSerializer(
@@ -188,14 +234,18 @@ class RecipeEditSerializer(serializers.ModelSerializer):
                 'Ингредиенты не должны повторяться!'
             )
         for ingredient in value:
-            if not Ingredient.objects.filter(id=ingredient['id']).exists():
-                raise serializers.ValidationError(
-                    f'Ингредиента с id - {ingredient["id"]} нет'
-                )
             if ingredient['amount'] < 1:
                 raise serializers.ValidationError(
                     'Минимальное количество ингредиента 1'
                 )
+        existing = set(Ingredient.objects.filter(
+            id__in=ids
+        ).values_list('id', flat=True))
+        for ingredient_id in ids:
+            if ingredient_id not in existing:
+                raise serializers.ValidationError(
+                    f'Ингредиента с id - {ingredient_id} нет'
+                )
         return value
 
     def validate_tags(self, value):
@@ -211,15 +261,40 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         return value
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            RecipeIngredient.objects.bulk_create([
-                RecipeIngredient(
-                    recipe=recipe,
-                    ingredient_id=ingredient.get('id'),
-                    amount=ingredient.get('amount'),
-                )
-            ])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient.get('id'),
+                amount=ingredient.get('amount'),
+            )
+            for ingredient in ingredients
+        ])
+
+    def update_ingredients(self, ingredients, recipe):
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipeingredient_set.all()
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            recipe.recipeingredient_set.filter(
+                ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, recipe_ingredient in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [item for item in ingredients if item['id'] not in current],
+            recipe
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -228,11 +303,12 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(ingredients, instance)
+            self.update_ingredients(
+                validated_data.pop('ingredients'), instance
+            )
         if 'tags' in validated_data:
             instance.tags.set(validated_data.pop('tags'))
         return super().update(instance, validated_data)
@@ -244,7 +320,8 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         ).data
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class ShoppingCartSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='recipe.id',
     )
@@ -255,13 +332,14 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         source='recipe.image',
         read_only=True,
     )
+    thumbnails = ThumbnailsField(source='recipe')
     cooking_time = serializers.ReadOnlyField(
         source='recipe.cooking_time',
     )
 
     class Meta:
         model = ShoppingCart
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnails', 'cooking_time')
 
     def validate(self, data):
         user = self.context.get('request').user
@@ -292,7 +370,14 @@ class SetPasswordSerializer(PasswordSerializer):
         return data
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit')
+    if limit is not None and limit.isdigit():
+        return int(limit)
+    return None
+
+
+class SubscribeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     email = serializers.CharField(
         source='author.email',
         read_only=True)
@@ -310,8 +395,7 @@ class SubscribeSerializer(serializers.ModelSerializer):
         read_only=True)
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(
-        source='author.recipe.count')
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Subscription
@@ -330,16 +414,23 @@ class SubscribeSerializer(serializers.ModelSerializer):
         return data
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj.author)
+        if hasattr(obj.author, 'limited_recipes'):
+            recipes = obj.author.limited_recipes
+        else:
+            recipes = Recipe.objects.filter(author=obj.author)[
+                :get_recipes_limit(self.context.get('request'))
+            ]
         return RecipeSubscribeReadSerializer(
             recipes,
-            many=True).data
+            many=True,
+            context=self.context).data
+
+    def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        stats = getattr(obj.author, 'stats', None)
+        return stats.recipes_count if stats else 0
 
     def get_is_subscribed(self, obj):
-        subscribe = Subscription.objects.filter(
-            user=self.context.get('request').user,
-            author=obj.author
-        )
-        if subscribe:
-            return True
-        return False
+        return obj.author_id in get_user_flags(
+            self.context.get('request')).subscriptions
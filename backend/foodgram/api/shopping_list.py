@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient
+
+
+def get_shopping_list(user):
+    """Ингредиенты из списка покупок, просуммированные одним запросом.
+
+    Строки читаются через серверный курсор порциями, поэтому память
+    не зависит от размера списка покупок.
+    """
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__recipe_shopping_cart__user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(amount=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+        .values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+        .iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
+    )
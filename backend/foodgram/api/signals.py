@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_user_token_keys, invalidate_tokens
+
+
+def invalidate_now_and_on_commit(keys):
+    """Второй сброс после коммита убирает запись, которую параллельный
+    запрос мог успеть закэшировать до коммита."""
+    invalidate_tokens(keys)
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    keys = get_user_token_keys(instance.pk)
+    if keys:
+        invalidate_now_and_on_commit(keys)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_now_and_on_commit([instance.key])
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ..middleware import get_query_budget
+from .dataset import reset_caches, seed_dataset
+
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+class SeededAPITestCase(APITestCase):
+    """Тесты API на общем наборе данных из seed_dataset().
+
+    Кэш файловый: как Redis в продакшене, он общий для всех
+    экземпляров бэкенда, которые на него смотрят.
+    """
+    dataset = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root, RECIPE_IMAGE_WORKERS=0,
+            CACHES={'default': {
+                'BACKEND': FILE_CACHE,
+                'LOCATION': os.path.join(cls.media_root, 'cache'),
+            }},
+        )
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_dataset(**cls.dataset)
+
+    def setUp(self):
+        reset_caches()
+
+    def authenticate(self, user):
+        token = Token.objects.get(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        """Считает запросы ко всем базам теста, включая реплики.
+
+        Отдаёт список, который после выхода заполнен запросами.
+        """
+        captured = []
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in sorted(self.databases)
+            }
+            yield captured
+        for alias, context in contexts.items():
+            captured.extend(
+                {**query, 'alias': alias}
+                for query in context.captured_queries
+            )
+        queries = '\n'.join(
+            f'{query["alias"]}: {query["sql"]}' for query in captured
+        )
+        self.assertLessEqual(
+            len(captured), limit,
+            f'{len(captured)} запросов вместо {limit}:\n{queries}'
+        )
+
+    def assertWithinBudget(self, view_name, method='GET'):
+        """Бюджет из settings.QUERY_BUDGETS, как в RequestMetricsMiddleware."""
+        return self.assertMaxQueries(get_query_budget(view_name, method))
@@ -0,0 +1,125 @@
+import random
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.authentication import local_tokens
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (
+    FavoriteRecipe, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+    Subscription, Tag
+)
+
+User = get_user_model()
+
+INGREDIENT_FILES = (
+    settings.BASE_DIR / 'data' / 'ingredients.csv',
+    settings.BASE_DIR.parent.parent / 'data' / 'ingredients.csv',
+)
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F2C94C', 'dessert'),
+)
+
+
+def png_bytes(color='orange'):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def reset_caches():
+    cache.clear()
+    local_tokens.clear()
+    ingredient_index.index = None
+
+
+def load_ingredients(fallback=200):
+    for path in INGREDIENT_FILES:
+        if path.exists():
+            call_command('load_ingredients', str(path), stdout=StringIO())
+            return
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(fallback)
+    )
+
+
+def seed_dataset(users=10, recipes=50, favorites=5, cart=5, seed=42):
+    """Наполняет базу правдоподобными данными без сигналов на каждую строку.
+
+    Счётчики и поисковый вектор пересчитываются в конце одним проходом.
+    Возвращает созданных пользователей.
+    """
+    generator = random.Random(seed)
+    load_ingredients()
+    tags = Tag.objects.bulk_create(
+        Tag(name=name, color=color, slug=slug) for name, color, slug in TAGS
+    )
+    authors = User.objects.bulk_create(
+        User(
+            username=f'user{number}', email=f'user{number}@example.com',
+            first_name='Имя', last_name='Фамилия'
+        )
+        for number in range(users)
+    )
+    Token.objects.bulk_create(
+        Token(user=user, key=Token.generate_key()) for user in authors
+    )
+    image = default_storage.save('recipes/seed.png', ContentFile(png_bytes()))
+    created = Recipe.objects.bulk_create(
+        Recipe(
+            author=generator.choice(authors),
+            name=f'Рецепт {number}',
+            text='Нарезать, смешать и подать к столу.',
+            image=image,
+            cooking_time=generator.randint(5, 120),
+        )
+        for number in range(recipes)
+    )
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe, ingredient_id=ingredient_id,
+            amount=generator.randint(1, 500)
+        )
+        for recipe in created
+        for ingredient_id in generator.sample(
+            ingredient_ids, generator.randint(3, 10)
+        )
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in created
+        for tag in generator.sample(tags, generator.randint(1, 2))
+    )
+    FavoriteRecipe.objects.bulk_create(
+        FavoriteRecipe(user=user, favorite_recipe=recipe)
+        for user in authors
+        for recipe in generator.sample(created, min(favorites, recipes))
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe)
+        for user in authors
+        for recipe in generator.sample(created, min(cart, recipes))
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for user in authors
+        for author in generator.sample(authors, min(3, users))
+        if author != user
+    )
+    call_command('rebuild_counters', stdout=StringIO())
+    Recipe.objects.update_search_vector()
+    reset_caches()
+    return authors
@@ -0,0 +1,144 @@
+import importlib
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from foodgram import urls as root_urls
+from recipes.models import Recipe, Tag
+
+from .. import urls
+from ..async_views import async_read_view
+from ..views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .base import SeededAPITestCase
+
+
+class AsyncReadViewTests(SeededAPITestCase):
+    """Асинхронные list и retrieve отдают то же, что синхронные."""
+    dataset = {'users': 4, 'recipes': 20}
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.token = Token.objects.get(user=self.user).key
+        self.factory = AsyncRequestFactory()
+
+    def call(self, view, url, params=None, token=None, **kwargs):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        request = self.factory.get(url, params or {}, headers=headers)
+        response = async_to_sync(view)(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def assertSameResponse(self, view, url, params=None, token=None,
+                           **kwargs):
+        self.client.credentials(
+            **({'HTTP_AUTHORIZATION': f'Token {token}'} if token else {})
+        )
+        expected = self.client.get(url, params)
+        response = self.call(view, url, params, token, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(
+            json.loads(response.content), json.loads(expected.content)
+        )
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+        return response
+
+    def test_recipe_list(self):
+        view = async_read_view(
+            RecipeViewSet, {'get': 'list', 'post': 'create'},
+            {'get': 'alist'}, basename='recipe', detail=False
+        )
+        url = reverse('api:recipe-list')
+        for params in (
+            {'limit': 5}, {'limit': 5, 'page': 2},
+            {'limit': 5, 'page': 'last'},
+            {'tags': ['breakfast'], 'is_favorited': 1},
+            {'pagination': 'cursor'},
+            {'page': 100}, {'page': 0}, {'page': 'first'},
+        ):
+            with self.subTest(params=params):
+                self.assertSameResponse(view, url, params, self.token)
+        self.assertSameResponse(view, url, {'limit': 5})
+        response = self.call(view, url, {'page': 100}, self.token)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_detail(self):
+        view = async_read_view(
+            RecipeViewSet, {'get': 'retrieve', 'delete': 'destroy'},
+            {'get': 'aretrieve'}, basename='recipe', detail=True
+        )
+        recipe = Recipe.objects.first()
+        url = reverse('api:recipe-detail', args=(recipe.id,))
+        response = self.assertSameResponse(
+            view, url, token=self.token, pk=str(recipe.id)
+        )
+        request = self.factory.get(url, headers={
+            'Authorization': f'Token {self.token}',
+            'If-None-Match': response['ETag'],
+        })
+        response = async_to_sync(view)(request, pk=str(recipe.id))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.call(view, url, pk='0')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reference_data(self):
+        tag = Tag.objects.first()
+        for view, url, kwargs in (
+            (async_read_view(
+                TagViewSet, {'get': 'list'}, {'get': 'alist'},
+                basename='tag', detail=False
+            ), reverse('api:tag-list'), {}),
+            (async_read_view(
+                TagViewSet, {'get': 'retrieve'}, {'get': 'aretrieve'},
+                basename='tag', detail=True
+            ), reverse('api:tag-detail', args=(tag.id,)),
+                {'pk': str(tag.id)}),
+            (async_read_view(
+                IngredientViewSet, {'get': 'list'}, {'get': 'alist'},
+                basename='ingredient', detail=False
+            ), reverse('api:ingredient-list'), {}),
+        ):
+            with self.subTest(url=url):
+                self.assertSameResponse(view, url, **kwargs)
+
+    def test_subscriptions(self):
+        view = async_read_view(
+            UserViewSet, {'get': 'subscriptions'},
+            {'get': 'asubscriptions'}, basename='user', detail=False,
+            **UserViewSet.subscriptions.kwargs
+        )
+        url = reverse('api:user-subscriptions')
+        self.assertSameResponse(view, url, {'recipes_limit': 2}, self.token)
+        response = self.call(view, url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def reload_urls(self):
+        importlib.reload(urls)
+        importlib.reload(root_urls)
+        clear_url_caches()
+
+    def test_actions_with_async_routes(self):
+        with override_settings(ASYNC_READ_VIEWS=True):
+            self.reload_urls()
+        self.addCleanup(self.reload_urls)
+        recipe = Recipe.objects.first()
+        detail = reverse('api:recipe-detail', args=(recipe.id,))
+        self.assertIs(resolve(detail).func.cls, RecipeViewSet)
+        self.assertTrue(resolve(detail).func.csrf_exempt)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = self.client.get(detail)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for name, params in (
+            ('api:recipe-download-shopping-cart', {'format': 'txt'}),
+            ('api:recipe-cookable', {'ingredients': [1]}),
+        ):
+            with self.subTest(name=name):
+                url = reverse(name)
+                self.assertEqual(resolve(url).url_name, name.split(':')[1])
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from ..authentication import (LocalCache, get_cache_key, get_user_values,
+                              local_tokens)
+from .base import SeededAPITestCase
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(SeededAPITestCase):
+    dataset = {'users': 3, 'recipes': 6}
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.user.set_password('Secret-password-1')
+        self.user.save()
+        self.key = Token.objects.get(user=self.user).key
+        self.authenticate(self.user)
+        self.me = reverse('api:user-me')
+
+    def assertNoTokenQueries(self):
+        with self.assertMaxQueries(1) as context:
+            response = self.client.get(self.me)
+        self.assertEqual(response.status_code, 200)
+        for query in context:
+            self.assertNotIn('authtoken_token', query['sql'])
+        return response
+
+    def test_cached_token_needs_no_queries(self):
+        self.assertEqual(self.client.get(self.me).status_code, 200)
+        response = self.assertNoTokenQueries()
+        self.assertEqual(response.data['username'], self.user.username)
+        local_tokens.clear()
+        self.assertNoTokenQueries()
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        response = self.client.get(self.me)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates(self):
+        self.client.get(self.me)
+        response = self.client.post(reverse('api:logout'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(self.me)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_set_password_invalidates(self):
+        self.client.get(self.me)
+        response = self.client.post(reverse('api:user-set-password'), {
+            'current_password': 'Secret-password-1',
+            'new_password': 'Secret-password-2',
+        })
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(local_tokens.get(self.key))
+        self.assertIsNone(cache.get(get_cache_key(self.key)))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Secret-password-2'))
+
+    def test_deactivation_invalidates(self):
+        self.client.get(self.me)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.me)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_change_is_visible(self):
+        self.client.get(self.me)
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertEqual(self.client.get(self.me).data['username'], 'renamed')
+        self.assertEqual(get_user_values(self.key)['username'], 'renamed')
+
+    def test_revocation_reaches_other_worker(self):
+        """Второй воркер: свой LRU и свой клиент того же общего кэша."""
+        location = settings.CACHES['default']['LOCATION']
+        worker = mock.patch.multiple(
+            'api.authentication',
+            local_tokens=LocalCache(16),
+            cache=FileBasedCache(location, {}),
+        )
+        with worker:
+            self.assertEqual(self.client.get(self.me).status_code, 200)
+        self.assertIsNotNone(cache.get(get_cache_key(self.key)))
+        self.client.post(reverse('api:logout'))
+        with worker:
+            response = self.client.get(self.me)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_write_does_not_save_cached_fields(self):
+        self.client.get(self.me)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.patch(self.me, {'first_name': 'Новое'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertEqual(self.user.first_name, 'Новое')
+
+    def test_process_local_cache_is_not_used(self):
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        with override_settings(CACHES=locmem):
+            self.client.get(self.me)
+            self.assertIsNone(cache.get(get_cache_key(self.key)))
+            with self.assertMaxQueries(2) as context:
+                self.assertEqual(self.client.get(self.me).status_code, 200)
+            token_query = context[0]['sql']
+            self.assertIn('authtoken_token', token_query)
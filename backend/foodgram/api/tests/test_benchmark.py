@@ -0,0 +1,102 @@
+import json
+import os
+import statistics
+import sys
+from time import perf_counter
+from unittest import skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+
+from .base import SeededAPITestCase
+
+
+@skipUnless(os.getenv('RUN_BENCHMARKS'), 'RUN_BENCHMARKS не задан')
+class APIBenchmark(SeededAPITestCase):
+    """Задержка p50/p95 и пропускная способность основных эндпоинтов.
+
+    Размер данных и число повторов задаются переменными окружения,
+    результаты дописываются в BENCHMARK_OUTPUT в формате JSON Lines.
+    """
+    dataset = {
+        'users': int(os.getenv('BENCHMARK_USERS', 200)),
+        'recipes': int(os.getenv('BENCHMARK_RECIPES', 3000)),
+        'favorites': 20,
+        'cart': 15,
+    }
+    iterations = int(os.getenv('BENCHMARK_ITERATIONS', 50))
+    results = []
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.users[0])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        sys.stderr.write(f'\n{"endpoint":<40}{"p50, мс":>10}'
+                         f'{"p95, мс":>10}{"rps":>10}\n')
+        for result in cls.results:
+            sys.stderr.write(
+                f'{result["endpoint"]:<40}{result["p50_ms"]:>10.1f}'
+                f'{result["p95_ms"]:>10.1f}{result["rps"]:>10.1f}\n'
+            )
+        output = os.getenv('BENCHMARK_OUTPUT')
+        if output:
+            with open(output, 'a', encoding='utf-8') as file:
+                for result in cls.results:
+                    file.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def measure(self, endpoint, url, params=None):
+        timings = []
+        for _ in range(self.iterations):
+            start = perf_counter()
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append(perf_counter() - start)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        percentiles = statistics.quantiles(timings, n=100)
+        self.results.append({
+            'endpoint': endpoint,
+            'database': connection.vendor,
+            'recipes': self.dataset['recipes'],
+            'iterations': self.iterations,
+            'p50_ms': percentiles[49] * 1000,
+            'p95_ms': percentiles[94] * 1000,
+            'rps': len(timings) / sum(timings),
+        })
+
+    def test_recipe_list(self):
+        url = reverse('api:recipe-list')
+        self.measure('recipes', url, {'limit': 6})
+        self.measure('recipes page 50', url, {'limit': 6, 'page': 50})
+        self.measure('recipes cursor', url, {'pagination': 'cursor'})
+        self.measure('recipes tags', url, {'tags': ['breakfast', 'lunch']})
+        self.client.credentials()
+        self.measure('recipes anonymous', url, {'limit': 6})
+
+    def test_subscriptions(self):
+        self.measure(
+            'subscriptions', reverse('api:user-subscriptions'),
+            {'recipes_limit': 3}
+        )
+
+    def test_download_shopping_cart(self):
+        url = reverse('api:recipe-download-shopping-cart')
+        for file_format in ('txt', 'csv', 'pdf'):
+            self.measure(
+                f'download_shopping_cart {file_format}', url,
+                {'format': file_format}
+            )
+
+
+class LoadtestCommandTests(SimpleTestCase):
+
+    def test_rejects_too_few_requests(self):
+        for options in ({'requests': 1}, {'concurrency': 0}):
+            with self.subTest(**options), self.assertRaises(CommandError):
+                call_command('loadtest', 'http://localhost:1/', **options)
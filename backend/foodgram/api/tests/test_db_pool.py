@@ -0,0 +1,143 @@
+import threading
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from foodgram.db_pool.pool import ConnectionPool, PoolTimeout
+
+from ..concurrency import run_on_query_thread
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    return not connection.closed and connection.healthy
+
+
+def reset(connection):
+    connection.in_transaction = False
+    return not connection.closed
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        options.setdefault('timeout', 0.2)
+        return ConnectionPool(check, reset, **options)
+
+    def test_reuses_released_connection(self):
+        pool = self.make_pool(max_size=2)
+        first, _ = pool.get(FakeConnection)
+        pool.put(first)
+        second, _ = pool.get(FakeConnection)
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_discards_unhealthy_connection_on_checkout(self):
+        pool = self.make_pool(max_size=1, check_interval=0)
+        first, _ = pool.get(FakeConnection)
+        pool.put(first)
+        first.healthy = False
+        second, _ = pool.get(FakeConnection)
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+
+    def test_skips_check_within_interval(self):
+        for options in ({'check_interval': 60}, {}):
+            with self.subTest(**options):
+                pool = self.make_pool(max_size=1, **options)
+                first, _ = pool.get(FakeConnection)
+                pool.put(first)
+                first.healthy = False
+                self.assertIs(pool.get(FakeConnection)[0], first)
+
+    def test_waits_for_released_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        first, _ = pool.get(FakeConnection)
+        timer = threading.Timer(0.05, pool.put, (first,))
+        timer.start()
+        second, wait = pool.get(FakeConnection)
+        timer.join()
+        self.assertIs(first, second)
+        self.assertGreater(wait, 0)
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreaterEqual(stats['wait_max'], wait)
+
+    def test_timeout_when_exhausted(self):
+        pool = self.make_pool(max_size=1)
+        pool.get(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.get(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_fill_and_idle_pruning_keep_min_size(self):
+        pool = self.make_pool(min_size=2, max_size=4, max_idle=0)
+        pool.fill(FakeConnection)
+        self.assertEqual(pool.stats()['idle'], 2)
+        connections = [pool.get(FakeConnection)[0] for _ in range(4)]
+        for item in connections:
+            pool.put(item)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['idle']), (2, 2))
+        self.assertEqual(sum(item.closed for item in connections), 2)
+
+    def test_failed_connect_releases_slot(self):
+        pool = self.make_pool(max_size=1)
+
+        def connect():
+            raise OSError
+
+        with self.assertRaises(OSError):
+            pool.get(connect)
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertIsNotNone(pool.get(FakeConnection)[0])
+
+
+class FakeWrapper(FakeConnection):
+    def __init__(self, engine):
+        super().__init__()
+        self.settings_dict = {'ENGINE': engine}
+
+
+class QueryThreadTests(SimpleTestCase):
+    def test_returns_pooled_connections(self):
+        pooled = FakeWrapper('foodgram.db_pool')
+        plain = FakeWrapper('django.db.backends.postgresql')
+        with mock.patch('api.concurrency.connections') as fake_connections:
+            fake_connections.all.return_value = [pooled, plain]
+            self.assertEqual(run_on_query_thread(lambda: 1), 1)
+        self.assertTrue(pooled.closed)
+        self.assertFalse(plain.closed)
+
+
+@skipUnless(
+    connection.settings_dict['ENGINE'] == 'foodgram.db_pool',
+    'Нужен PostgreSQL с DB_POOL_MAX_SIZE'
+)
+class PostgresPoolTests(TransactionTestCase):
+    """Проверка на живой базе: PostgreSQL или pgbouncer перед ним."""
+
+    def test_connection_returns_to_pool(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        pool = connection.pool
+        connection.close()
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+        self.assertGreaterEqual(pool.stats()['checkouts'], 2)
+
+    def test_pool_wait_in_server_timing(self):
+        connection.close()
+        response = self.client.get(reverse('api:recipe-list'))
+        self.assertIn('pool;dur=', response['Server-Timing'])
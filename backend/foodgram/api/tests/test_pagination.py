@@ -0,0 +1,56 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.urls import reverse
+from rest_framework import status
+
+from recipes.models import Recipe
+
+from ..pagination import LimitCursorPagination
+from .base import SeededAPITestCase
+
+
+class RecipePaginationTests(SeededAPITestCase):
+    dataset = {'users': 3, 'recipes': 12}
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api:recipe-list')
+
+    def test_search_disables_cursor(self):
+        response = self.client.get(
+            self.url, {'pagination': 'cursor', 'search': 'Рецепт'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('count', response.data)
+        self.assertNotIn('cursor=', response.data['next'] or '')
+
+    def test_cursor_follows_view_ordering(self):
+        newest = Recipe.objects.order_by('-id').first()
+        Recipe.objects.filter(pk=newest.pk).update(
+            pub_date=Recipe.objects.order_by('pub_date').first().pub_date
+            - timedelta(days=1)
+        )
+        expected = [
+            item['id'] for item in
+            self.client.get(self.url, {'limit': 100}).data['results']
+        ]
+        ids = []
+        url, params = self.url, {'pagination': 'cursor', 'limit': 5}
+        while url:
+            data = self.client.get(url, params).data
+            ids += [item['id'] for item in data['results']]
+            url, params = data['next'], None
+        self.assertEqual(ids, expected)
+        self.assertEqual(ids[-1], newest.id)
+
+    def test_cursor_uses_view_ordering_without_filter(self):
+        view = SimpleNamespace(filter_backends=(), ordering=('-pub_date',))
+        self.assertEqual(
+            LimitCursorPagination().get_ordering(None, None, view),
+            ('-pub_date',)
+        )
+        view.ordering = None
+        self.assertEqual(
+            LimitCursorPagination().get_ordering(None, None, view), ('-id',)
+        )
@@ -0,0 +1,429 @@
+from base64 import b64encode
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from recipes.models import (
+    FavoriteRecipe, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+    Subscription, Tag
+)
+from recipes.reference import get_reference_data
+
+from .base import SeededAPITestCase
+from .dataset import png_bytes, reset_caches
+
+User = get_user_model()
+
+IMAGE = 'data:image/png;base64,' + b64encode(png_bytes('green')).decode()
+
+
+class RecipeQueryCountTests(SeededAPITestCase):
+    dataset = {'users': 6, 'recipes': 40}
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.authenticate(self.user)
+        self.recipe = Recipe.objects.filter(author=self.user).first()
+        self.other_recipe = Recipe.objects.exclude(author=self.user).first()
+
+    def recipe_payload(self):
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': pk, 'amount': 10}
+                for pk in Ingredient.objects.values_list('id', flat=True)[:5]
+            ],
+        }
+
+    def test_list_does_not_grow_with_page_size(self):
+        url = reverse('api:recipe-list')
+        for limit in (5, 40):
+            with self.subTest(limit=limit), \
+                    self.assertWithinBudget('api:recipe-list'):
+                response = self.client.get(url, {'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_filters(self):
+        url = reverse('api:recipe-list')
+        for params in (
+            {'tags': ['breakfast', 'lunch']},
+            {'author': self.user.id},
+            {'is_favorited': 1},
+            {'is_in_shopping_cart': 1},
+            {'search': 'Рецепт'},
+            {'ordering': '-favorites_count'},
+            {'pagination': 'cursor'},
+        ):
+            reset_caches()
+            with self.subTest(params=params), \
+                    self.assertWithinBudget('api:recipe-list'):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_reference_data_once_per_request(self):
+        url = reverse('api:recipe-list')
+        with mock.patch(
+            'api.mixins.get_reference_data', wraps=get_reference_data
+        ) as in_view, mock.patch(
+            'api.serializers.get_reference_data', wraps=get_reference_data
+        ) as in_serializer:
+            response = self.client.get(url, {'limit': 10})
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(in_view.call_count, 1)
+        in_serializer.assert_not_called()
+
+    def test_anonymous_list_is_served_from_cache(self):
+        self.client.credentials()
+        url = reverse('api:recipe-list')
+        self.client.get(url, {'limit': 10})
+        # Остаётся только чтение версии ленты.
+        with self.assertMaxQueries(1):
+            response = self.client.get(url, {'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cached_list_keeps_host_and_scheme(self):
+        self.client.credentials()
+        url = reverse('api:recipe-list')
+        for host, secure in (
+            ('backend:8000', False), ('localhost', True),
+            ('backend:8000', False),
+        ):
+            with self.subTest(host=host, secure=secure):
+                response = self.client.get(
+                    url, {'limit': 5}, HTTP_HOST=host, secure=secure
+                )
+                scheme = 'https' if secure else 'http'
+                self.assertTrue(
+                    response.json()['next'].startswith(f'{scheme}://{host}/')
+                )
+
+    def test_detail(self):
+        url = reverse('api:recipe-detail', args=(self.recipe.id,))
+        with self.assertWithinBudget('api:recipe-detail'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertMaxQueries(2):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_follows_author(self):
+        url = reverse('api:recipe-detail', args=(self.recipe.id,))
+        Recipe.objects.filter(pk=self.recipe.id).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        self.client.credentials()
+        response = self.client.get(url)
+        author = self.recipe.author
+        author.first_name = 'Переименован'
+        author.save()
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=list(headers)):
+                fresh = self.client.get(url, **headers)
+                self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    fresh.data['author']['first_name'], 'Переименован'
+                )
+
+    def test_list_etag_follows_database(self):
+        """Флаги, изменённые другим воркером, меняют ETag и ответ."""
+        url = reverse('api:recipe-list')
+        response = self.client.get(url, {'limit': 40})
+        etag = response['ETag']
+        with self.assertMaxQueries(2):
+            response = self.client.get(
+                url, {'limit': 40}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        recipe = Recipe.objects.exclude(favoriterecipe__user=self.user).first()
+        FavoriteRecipe.objects.create(user=self.user, favorite_recipe=recipe)
+        response = self.client.get(
+            url, {'limit': 40}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        favorited = {
+            item['id'] for item in response.data['results']
+            if item['is_favorited']
+        }
+        self.assertIn(recipe.id, favorited)
+
+    @mock.patch('recipes.signals.schedule_renditions')
+    def test_create(self, schedule_renditions):
+        with self.assertWithinBudget('api:recipe-list', 'POST'):
+            response = self.client.post(
+                reverse('api:recipe-list'), self.recipe_payload(),
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @mock.patch('recipes.signals.schedule_renditions')
+    def test_update(self, schedule_renditions):
+        payload = self.recipe_payload()
+        del payload['image']
+        with self.assertWithinBudget('api:recipe-detail', 'PATCH'):
+            response = self.client.patch(
+                reverse('api:recipe-detail', args=(self.recipe.id,)),
+                payload, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_delete(self):
+        with self.assertWithinBudget('api:recipe-detail', 'DELETE'):
+            response = self.client.delete(
+                reverse('api:recipe-detail', args=(self.recipe.id,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_download_shopping_cart(self):
+        url = reverse('api:recipe-download-shopping-cart')
+        for file_format in ('txt', 'csv', 'pdf'):
+            with self.subTest(format=file_format), self.assertWithinBudget(
+                    'api:recipe-download-shopping-cart'):
+                response = self.client.get(url, {'format': file_format})
+                b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_download_errors_are_json(self):
+        url = reverse('api:recipe-download-shopping-cart')
+        response = self.client.get(url, {'format': 'xls'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.client.credentials()
+        response = self.client.get(url, {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+
+    def test_streamed_queries_are_logged(self):
+        url = reverse('api:recipe-download-shopping-cart')
+        with self.assertLogs('api.middleware', 'INFO') as logs:
+            response = self.client.get(url, {'format': 'txt'})
+            self.assertEqual(logs.output, [])
+            b''.join(response.streaming_content)
+        self.assertIn('queries=', logs.output[0])
+        self.assertNotIn('queries=0 ', logs.output[0])
+        self.assertNotIn('Server-Timing', response)
+
+    def test_serialization_is_timed(self):
+        url = reverse('api:recipe-list')
+        with self.assertLogs('api.middleware', 'INFO') as logs:
+            response = self.client.get(url, {'limit': 20})
+        timings = dict(
+            entry.split(';', 1)[0:2]
+            for entry in response['Server-Timing'].split(', ')
+        )
+        serialize = float(timings['serialize'].split(';')[0][4:])
+        self.assertGreater(serialize, 0)
+        self.assertLess(serialize, float(timings['total'][4:]))
+        self.assertNotIn('serialize_ms=0.0 ', logs.output[0])
+
+    def test_cookable(self):
+        ingredients = self.recipe.recipeingredient_set.values_list(
+            'ingredient_id', flat=True
+        )
+        with self.assertWithinBudget('api:recipe-cookable'):
+            response = self.client.get(
+                reverse('api:recipe-cookable'),
+                {'ingredients': list(ingredients)}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['id'], self.recipe.id)
+
+    def test_cookable_index_expires_without_shared_cache(self):
+        """Состав, изменённый другим воркером, виден после
+        INGREDIENT_INDEX_LOCAL_TIMEOUT секунд."""
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        url = reverse('api:recipe-cookable')
+        params = {'ingredients': list(
+            self.recipe.recipeingredient_set.values_list(
+                'ingredient_id', flat=True
+            )
+        )}
+        with override_settings(CACHES=locmem):
+            self.client.get(url, params)
+            RecipeIngredient.objects.filter(recipe=self.recipe).delete()
+            ids = [item['id'] for item in self.client.get(url, params).data]
+            self.assertIn(self.recipe.id, ids)
+            with override_settings(INGREDIENT_INDEX_LOCAL_TIMEOUT=0):
+                response = self.client.get(url, params)
+        self.assertNotIn(
+            self.recipe.id, [item['id'] for item in response.data]
+        )
+
+    def test_favorite(self):
+        FavoriteRecipe.objects.filter(
+            user=self.user, favorite_recipe=self.other_recipe
+        ).delete()
+        url = reverse('api:favorite-list', args=(self.other_recipe.id,))
+        with self.assertWithinBudget('api:favorite-list', 'POST'):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertWithinBudget('api:favorite-list', 'DELETE'):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_shopping_cart(self):
+        ShoppingCart.objects.filter(
+            user=self.user, recipe=self.other_recipe
+        ).delete()
+        url = reverse('api:shopping_cart-list', args=(self.other_recipe.id,))
+        with self.assertWithinBudget('api:shopping_cart-list', 'POST'):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertWithinBudget('api:shopping_cart-list', 'DELETE'):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class ReferenceQueryCountTests(SeededAPITestCase):
+    dataset = {'users': 2, 'recipes': 5}
+
+    def test_tags_and_ingredients(self):
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        for url, params in (
+            (reverse('api:tag-list'), {}),
+            (reverse('api:tag-detail', args=(tag.id,)), {}),
+            (reverse('api:ingredient-list'), {}),
+            (reverse('api:ingredient-list'), {'name': ingredient.name[:3]}),
+            (reverse('api:ingredient-detail', args=(ingredient.id,)), {}),
+        ):
+            with self.subTest(url=url, params=params):
+                self.client.get(url, params)
+                with self.assertMaxQueries(0):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_version_bumped_after_commit(self):
+        """Снимок, собранный до коммита, не остаётся под новой версией."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Новый', color='#000000', slug='new')
+            before_commit = get_reference_data()
+        self.assertNotEqual(get_reference_data(), before_commit)
+
+    def test_reference_data_once_per_request(self):
+        with mock.patch(
+            'api.mixins.get_reference_data', wraps=get_reference_data
+        ) as snapshot:
+            self.client.get(reverse('api:tag-list'))
+        self.assertEqual(snapshot.call_count, 1)
+
+    def test_snapshot_expires_without_shared_cache(self):
+        """Тег, добавленный другим воркером, виден после
+        REFERENCE_DATA_LOCAL_TIMEOUT секунд."""
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        url = reverse('api:recipe-list')
+        with override_settings(CACHES=locmem):
+            etag = self.client.get(reverse('api:tag-list'))['ETag']
+            Tag.objects.bulk_create([
+                Tag(name='Новый', color='#000000', slug='new')
+            ])
+            response = self.client.get(url, {'tags': 'new'})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            with override_settings(REFERENCE_DATA_LOCAL_TIMEOUT=0):
+                response = self.client.get(url, {'tags': 'new'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                response = self.client.get(reverse('api:tag-list'))
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn('Last-Modified', response)
+
+
+class UserQueryCountTests(SeededAPITestCase):
+    dataset = {'users': 6, 'recipes': 30}
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.user.set_password('Secret-password-1')
+        self.user.save()
+        self.authenticate(self.user)
+        self.author = self.users[1]
+
+    def test_read_routes(self):
+        for view_name, args, params in (
+            ('api:user-list', (), {}),
+            ('api:user-detail', (self.user.id,), {}),
+            ('api:user-me', (), {}),
+            ('api:user-subscriptions', (), {'recipes_limit': 3}),
+        ):
+            reset_caches()
+            with self.subTest(view=view_name), \
+                    self.assertWithinBudget(view_name):
+                response = self.client.get(
+                    reverse(view_name, args=args), params
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_user(self):
+        self.client.credentials()
+        with self.assertWithinBudget('api:user-list', 'POST'):
+            response = self.client.post(reverse('api:user-list'), {
+                'email': 'new@example.com',
+                'username': 'newuser',
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'password': 'Secret-password-2',
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_set_password(self):
+        with self.assertWithinBudget('api:user-set-password', 'POST'):
+            response = self.client.post(reverse('api:user-set-password'), {
+                'current_password': 'Secret-password-1',
+                'new_password': 'Secret-password-2',
+            })
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_subscribe_and_unsubscribe(self):
+        Subscription.objects.filter(
+            user=self.user, author=self.author
+        ).delete()
+        with self.assertWithinBudget('api:subscribe-list', 'POST'):
+            response = self.client.post(
+                reverse('api:subscribe-list', args=(self.author.id,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        subscription = Subscription.objects.get(
+            user=self.user, author=self.author
+        )
+        with self.assertWithinBudget('api:subscribe-detail', 'DELETE'):
+            response = self.client.delete(reverse(
+                'api:subscribe-detail',
+                args=(self.author.id, subscription.id)
+            ))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_token_login_and_logout(self):
+        self.client.credentials()
+        with self.assertWithinBudget('api:login', 'POST'):
+            response = self.client.post(reverse('api:login'), {
+                'email': self.user.email,
+                'password': 'Secret-password-1',
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+        )
+        with self.assertWithinBudget('api:logout', 'POST'):
+            response = self.client.post(reverse('api:logout'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,131 @@
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from foodgram.routers import ReplicaRouter
+from recipes.models import Recipe
+
+from .base import SeededAPITestCase
+
+SEPARATE_REPLICAS = [
+    alias for alias in settings.DATABASE_REPLICAS
+    if not connections.databases[alias]['TEST'].get('MIRROR')
+]
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTests(SeededAPITestCase):
+    """Выбор реплики без второй базы: реплика указывает на default."""
+    dataset = {'users': 3, 'recipes': 10}
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        patcher = mock.patch(
+            'foodgram.routers.choice', side_effect=lambda aliases: aliases[0]
+        )
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_favorite(self):
+        return Recipe.objects.exclude(author=self.user).exclude(
+            favoriterecipe__user=self.user
+        ).first()
+
+    def get(self, name, *args, **params):
+        self.choice.reset_mock()
+        response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return self.choice.called
+
+    def test_reads_go_to_replica(self):
+        self.authenticate(self.user)
+        self.assertTrue(self.get('api:recipe-list'))
+        recipe = Recipe.objects.first()
+        self.assertTrue(self.get('api:recipe-detail', recipe.id))
+        self.assertTrue(self.get('api:user-list'))
+        self.assertTrue(self.get('api:user-subscriptions'))
+
+    def test_cached_feed_reads_primary(self):
+        self.assertFalse(self.get('api:recipe-list'))
+        self.assertTrue(self.get('api:recipe-list', is_favorited=0))
+
+    def test_writer_sticks_to_primary(self):
+        self.authenticate(self.user)
+        recipe = self.new_favorite()
+        response = self.client.post(
+            reverse('api:favorite-list', args=(recipe.id,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.get('api:recipe-list'))
+        self.client.credentials()
+        self.assertTrue(self.get('api:recipe-list', is_favorited=0))
+
+    def test_sticky_cookie_is_per_user(self):
+        self.authenticate(self.user)
+        recipe = self.new_favorite()
+        self.client.post(reverse('api:favorite-list', args=(recipe.id,)))
+        self.assertFalse(self.get('api:recipe-list'))
+        self.authenticate(self.users[1])
+        self.assertTrue(self.get('api:recipe-list'))
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        with override_settings(DATABASE_REPLICAS=['replica_1']):
+            self.assertTrue(router.allow_migrate('default', 'recipes'))
+            self.assertFalse(router.allow_migrate('replica_1', 'recipes'))
+
+    def test_sticky_window_expires(self):
+        self.authenticate(self.user)
+        recipe = self.new_favorite()
+        with override_settings(DATABASE_REPLICA_STICKY_TIMEOUT=0):
+            self.client.post(reverse('api:favorite-list', args=(recipe.id,)))
+            self.assertTrue(self.get('api:recipe-list'))
+
+
+@skipUnless(SEPARATE_REPLICAS, 'Нужна отдельная база-реплика')
+class SeparateReplicaTests(SeededAPITestCase):
+    """Две локальные базы: данные есть только в основной.
+
+    Запуск: DB_ENGINE=sqlite3 SQLITE_REPLICA_PATHS=replica.sqlite3
+    python manage.py test api.tests.test_replicas
+    """
+    dataset = {'users': 3, 'recipes': 10}
+    databases = {'default', *SEPARATE_REPLICAS}
+
+    @classmethod
+    def setUpClass(cls):
+        # Роутер не пускает миграции на реплики: пустые таблицы
+        # создаются напрямую, как их создала бы репликация.
+        for alias in SEPARATE_REPLICAS:
+            with connections[alias].schema_editor() as editor:
+                for model in apps.get_models():
+                    if model._meta.managed and not model._meta.proxy:
+                        editor.create_model(model)
+        super().setUpClass()
+
+    def test_read_your_writes(self):
+        user = self.users[0]
+        self.authenticate(user)
+        url = reverse('api:recipe-list')
+        with self.assertWithinBudget('api:recipe-list') as queries:
+            self.assertEqual(self.client.get(url).data['count'], 0)
+        self.assertIn(
+            SEPARATE_REPLICAS[0], {query['alias'] for query in queries}
+        )
+        recipe = Recipe.objects.exclude(author=user).exclude(
+            favoriterecipe__user=user
+        ).first()
+        response = self.client.post(
+            reverse('api:favorite-list', args=(recipe.id,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(url, {'is_favorited': 1})
+        self.assertIn(
+            recipe.id, [item['id'] for item in response.data['results']]
+        )
@@ -1,4 +1,5 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import include, path, re_path
 
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -6,6 +7,8 @@ from .views import (
     UserViewSet, FavoriteRecipeViewSet, ShoppingCartViewSet,
     SubscribeViewSet,
 )
+from .async_views import async_read_view
+
 app_name = 'api'
 
 router = DefaultRouter()
@@ -24,7 +27,46 @@ router.register(
     r'users/(?P<user_id>\d+)/subscribe', SubscribeViewSet,
     basename='subscribe')
 
-urlpatterns = [
+# Детальные маршруты только с числовым pk, иначе они перехватят
+# @action роутера вроде recipes/cookable/. pk остаётся строкой.
+urlpatterns = []
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns += [
+        path('recipes/', async_read_view(
+            RecipeViewSet, {'get': 'list', 'post': 'create'},
+            {'get': 'alist'}, basename='recipe', detail=False
+        ), name='recipe-list'),
+        re_path(r'^recipes/(?P<pk>\d+)/$', async_read_view(
+            RecipeViewSet, {
+                'get': 'retrieve', 'put': 'update',
+                'patch': 'partial_update', 'delete': 'destroy'
+            },
+            {'get': 'aretrieve'}, basename='recipe', detail=True
+        ), name='recipe-detail'),
+        path('tags/', async_read_view(
+            TagViewSet, {'get': 'list'}, {'get': 'alist'},
+            basename='tag', detail=False
+        ), name='tag-list'),
+        re_path(r'^tags/(?P<pk>\d+)/$', async_read_view(
+            TagViewSet, {'get': 'retrieve'}, {'get': 'aretrieve'},
+            basename='tag', detail=True
+        ), name='tag-detail'),
+        path('ingredients/', async_read_view(
+            IngredientViewSet, {'get': 'list'}, {'get': 'alist'},
+            basename='ingredient', detail=False
+        ), name='ingredient-list'),
+        re_path(r'^ingredients/(?P<pk>\d+)/$', async_read_view(
+            IngredientViewSet, {'get': 'retrieve'}, {'get': 'aretrieve'},
+            basename='ingredient', detail=True
+        ), name='ingredient-detail'),
+        path('users/subscriptions/', async_read_view(
+            UserViewSet, {'get': 'subscriptions'},
+            {'get': 'asubscriptions'}, basename='user', detail=False,
+            **UserViewSet.subscriptions.kwargs
+        ), name='user-subscriptions'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken'))
 ]
@@ -0,0 +1,71 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import (
+    AuthorStats, FavoriteRecipe, ShoppingCart, Subscription
+)
+
+UserFlags = namedtuple(
+    'UserFlags', ('version', 'favorites', 'shopping_cart', 'subscriptions')
+)
+
+EMPTY_FLAGS = UserFlags(0, frozenset(), frozenset(), frozenset())
+
+
+def get_cache_key(user, version):
+    return f'user_flags_{user.pk}_{version}'
+
+
+def get_flags_version(user):
+    """Версия растёт в той же транзакции, что и изменение флагов."""
+    return AuthorStats.objects.filter(user_id=user.pk).values_list(
+        'flags_version', flat=True
+    ).first() or 0
+
+
+def load_user_flags(user, version):
+    return UserFlags(
+        version=version,
+        favorites=frozenset(FavoriteRecipe.objects.filter(
+            user=user
+        ).values_list('favorite_recipe_id', flat=True)),
+        shopping_cart=frozenset(ShoppingCart.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True)),
+        subscriptions=frozenset(Subscription.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True)),
+    )
+
+
+def get_user_flags(request):
+    """Id избранного, списка покупок и подписок текущего пользователя.
+
+    Загружаются один раз на запрос, между запросами живут в кэше под
+    версией из базы, поэтому устаревшую запись не прочитает ни один
+    воркер.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return EMPTY_FLAGS
+    flags = getattr(request, '_user_flags', None)
+    if flags is None:
+        version = get_flags_version(user)
+        key = get_cache_key(user, version)
+        flags = cache.get(key)
+        if flags is None:
+            flags = load_user_flags(user, version)
+            cache.set(key, flags, settings.USER_FLAGS_CACHE_TIMEOUT)
+        request._user_flags = flags
+    return flags
+
+
+def invalidate_user_flags(request):
+    """После коммита запрос перечитает флаги с новой версией.
+
+    Флаги, прочитанные до отката транзакции, в запросе не остаются.
+    """
+    transaction.on_commit(lambda: setattr(request, '_user_flags', None))
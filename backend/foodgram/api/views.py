@@ -1,7 +1,19 @@
+import asyncio
+from hashlib import md5
+from operator import attrgetter
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 
 
@@ -10,11 +22,8 @@ from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-from collections import defaultdict
-
-
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse
+from django.http import Http404, StreamingHttpResponse
 
 from rest_framework import viewsets
 from rest_framework.permissions import SAFE_METHODS
@@ -23,30 +32,145 @@ from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly, IsAuthenticated
 )
 
+from foodgram.caches import is_shared_cache
 from recipes.models import (
     Tag, Ingredient, Recipe, FavoriteRecipe, ShoppingCart,
-    Subscription
+    Subscription, RecipeIngredient
+)
+from recipes.feed import get_feed_version, get_feed_versions
+from recipes.ingredient_index import ingredient_index
+from recipes.reference import get_last_modified
+
+from .concurrency import in_thread
+from .mixins import (
+    AsyncReadModelMixin, ConditionalGetMixin, CreateOrDestroyViewSet,
+    ReferenceDataMixin, ReplicaReadMixin, ResponseCacheMixin
 )
-
-from .mixins import CreateOrDestroyViewSet
 from .serializers import (
     TagSerializer, RecipeReadSerializer,
     RecipeEditSerializer, IngredientsReadSerializer,
     UserListSerializer, UserCreateSerializer,
-    SetPasswordSerializer, RecipeIngredient,
+    SetPasswordSerializer,
     FavoriteRecipeSerializer, ShoppingCartSerializer,
-    SubscribeSerializer
+    SubscribeSerializer, CookableRecipeSerializer,
+    CookableQuerySerializer, get_recipes_limit
 )
-from .filters import IngredientsFilter, RecipesFilter
+from .filters import RecipeSearchFilter, RecipesFilter
+from .renderers import SHOPPING_LIST_RENDERERS
+from .shopping_list import get_shopping_list
+from .user_flags import get_user_flags, invalidate_user_flags
 
 User = get_user_model()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+FEED_CACHE_PARAMS = frozenset(
+    ('tags', 'author', 'page', 'limit', 'pagination', 'cursor', 'format')
+)
+
+
+class RecipeViewSet(ReplicaReadMixin, ReferenceDataMixin,
+                    ConditionalGetMixin, ResponseCacheMixin,
+                    AsyncReadModelMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [
+        DjangoFilterBackend, filters.OrderingFilter, RecipeSearchFilter
+    ]
     filterset_class = RecipesFilter
+    ordering_fields = ('pub_date', 'favorites_count', 'shopping_cart_count')
+    ordering = ('-pub_date', '-id')
+    vary_headers = ('Authorization',)
+    response_cache_timeout = settings.RECIPE_FEED_CACHE_TIMEOUT
+
+    def get_response_cache_key(self):
+        # Ключ нужен роутеру, валидаторам и самому кэшу: считается раз.
+        if not hasattr(self, 'response_cache_key'):
+            self.response_cache_key = self.build_response_cache_key()
+        return self.response_cache_key
+
+    def build_response_cache_key(self):
+        request = self.request
+        if self.action != 'list' or request.user.is_authenticated:
+            return None
+        params = request.query_params
+        if not FEED_CACHE_PARAMS.issuperset(params):
+            return None
+        query = urlencode(sorted(
+            (name, value)
+            for name in params for value in set(params.getlist(name))
+        ))
+        # В теле абсолютные ссылки, поэтому важны схема и хост.
+        key = ':'.join((
+            str(get_feed_version()), self.get_reference_data().digest,
+            request.scheme, request.get_host(),
+            request.accepted_renderer.format, query
+        ))
+        return f'recipe_feed_{md5(key.encode()).hexdigest()}'
+
+    def use_replica(self):
+        # Страница ленты живёт в кэше до следующего изменения рецептов,
+        # поэтому собирается из основной базы.
+        return self.get_response_cache_key() is None
+
+    def get_validators(self):
+        flags = get_user_flags(self.request)
+        if self.action == 'list':
+            cache_key = self.get_response_cache_key()
+            if cache_key is not None:
+                return (cache_key,), None
+            recipes, counters = get_feed_versions()
+            etag_parts = (
+                recipes, self.request.user.pk, flags.version,
+                self.get_reference_data().digest,
+            )
+            if filters.OrderingFilter.ordering_param in (
+                    self.request.query_params):
+                etag_parts += (counters,)
+            return etag_parts, None
+        pk = self.kwargs[self.lookup_field]
+        if not pk.isdigit():
+            return None, None
+        recipe = Recipe.objects.filter(pk=pk).values(
+            'id', 'author_id', 'updated_at',
+            author_updated_at=F('author__stats__profile_updated_at'),
+        ).first()
+        if recipe is None:
+            return None, None
+        # В ответе есть автор, поэтому учитывается и его профиль.
+        updated_at = max(filter(None, (
+            recipe['updated_at'], recipe['author_updated_at']
+        )))
+        etag_parts = (
+            recipe['updated_at'], recipe['author_updated_at'],
+            recipe['id'] in flags.favorites,
+            recipe['id'] in flags.shopping_cart,
+            recipe['author_id'] in flags.subscriptions,
+            self.get_reference_data().digest,
+        )
+        if self.request.user.is_authenticated:
+            return etag_parts, None
+        return etag_parts, updated_at.timestamp()
+
+    def preload(self):
+        get_user_flags(self.request)
+        self.get_reference_data()
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['reference_data'] = self.get_reference_data()
+        return context
+
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.only(
+                    'recipe_id', 'ingredient_id', 'amount'
+                )
+            ),
+        ).with_user_flags(self.request.user)
+
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         data = request.data
         serializer = RecipeEditSerializer(
@@ -71,12 +195,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Запрещено изменение чужого контента')
         super().perform_update(serializer)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         if instance.author != self.request.user:
             raise PermissionDenied('Запрещено удаление чужого контента')
         super().perform_destroy(instance)
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Ошибки выгрузки отдаются в JSON, а не под типом файла.
+        if (self.action == 'download_shopping_cart'
+                and isinstance(response, Response)
+                and response.status_code >= 400):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+    )
     def download_shopping_cart(self, request):
         if not request.user.is_authenticated:
             return Response(
@@ -84,52 +222,89 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
         user = self.request.user
-        ingredient_dict = defaultdict(list)
-        cart_items = ShoppingCart.objects.filter(user=user)
-
-        for cart_item in cart_items:
-            recipe = cart_item.recipe
-            recipe_ingredients = RecipeIngredient.objects.filter(recipe=recipe)
-            for recipe_ingredient in recipe_ingredients:
-                ingredient_info = {
-                    'name': recipe_ingredient.ingredient.name,
-                    'amount': recipe_ingredient.amount,
-                    'measurement_unit':
-                        recipe_ingredient.ingredient.measurement_unit
-                }
-                ingredient_dict[recipe.name].append(ingredient_info)
-        text = ""
-        for recipe_name, ingredients in ingredient_dict.items():
-            text += f"Название рецепта: {recipe_name}\n"
-            for ingredient in ingredients:
-                text += (
-                    f"    {ingredient['name']}, "
-                    f"{ingredient['amount']} "
-                    f"{ingredient['measurement_unit']},\n"
-                )
-
-        filename = f"{user.username}_shopping_list.txt"
-        response = HttpResponse(
-            text, content_type="text/plain; charset=utf-8"
+        renderer = request.accepted_renderer
+        filename = f"{user.username}_shopping_list.{renderer.format}"
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
+        response = StreamingHttpResponse(
+            renderer.stream(get_shopping_list(user)),
+            content_type=content_type
         )
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
 
+    @action(detail=False)
+    def cookable(self, request):
+        query = CookableQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        matches = ingredient_index.search(
+            query.validated_data['ingredients'],
+            settings.COOKABLE_RECIPES_LIMIT
+        )
+        recipes = self.get_queryset().in_bulk(
+            [match.recipe_id for match in matches]
+        )
+        result = []
+        for match in matches:
+            recipe = recipes.get(match.recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = round(match.coverage, 3)
+            recipe.missing_ingredients = match.total - match.matched
+            result.append(recipe)
+        serializer = CookableRecipeSerializer(
+            result, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+
+class ReferenceDataViewSet(ReplicaReadMixin, ReferenceDataMixin,
+                           ConditionalGetMixin, AsyncReadModelMixin,
+                           viewsets.ReadOnlyModelViewSet):
+    pagination_class = None
+    filter_backends = []
+
+    # Функция от снимка справочников: словарь записей по id.
+    get_records = None
+
+    def get_queryset(self):
+        return list(self.get_records(self.get_reference_data()).values())
+
+    def get_object(self):
+        records = self.get_records(self.get_reference_data())
+        pk = self.kwargs[self.lookup_field]
+        if not pk.isdigit() or int(pk) not in records:
+            raise Http404
+        return records[int(pk)]
+
+    def get_validators(self):
+        # Без общего кэша у каждого воркера своя дата изменения.
+        last_modified = get_last_modified() if is_shared_cache() else None
+        return (self.get_reference_data().digest,), last_modified
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReferenceDataViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    pagination_class = None
+    get_records = attrgetter('tags')
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceDataViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientsReadSerializer
-    pagination_class = None
-    filterset_class = IngredientsFilter
+    get_records = attrgetter('ingredients')
+
+    def get_queryset(self):
+        name = self.request.query_params.get('name')
+        if not name:
+            return super().get_queryset()
+        return self.get_reference_data().search_ingredients(
+            name, settings.INGREDIENTS_AUTOCOMPLETE_LIMIT
+        )
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(ReplicaReadMixin, AsyncReadModelMixin, UserViewSet):
     queryset = User.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
@@ -149,14 +324,39 @@ class UserViewSet(UserViewSet):
         methods=("get",), detail=False, permission_classes=(IsAuthenticated,)
     )
     def subscriptions(self, request):
-        user = request.user
-        queryset = Subscription.objects.filter(user=user)
-        pages = self.paginate_queryset(queryset)
+        pages = self.paginate_queryset(self.get_subscriptions(request))
         serializer = SubscribeSerializer(
             pages, many=True,
             context={'request': request})
         return self.get_paginated_response(serializer.data)
 
+    async def asubscriptions(self, request):
+        pages, _ = await asyncio.gather(
+            self.paginator.apaginate_queryset(
+                self.get_subscriptions(request), request, view=self
+            ),
+            in_thread(get_user_flags, request),
+        )
+        serializer = SubscribeSerializer(
+            pages, many=True,
+            context={'request': request})
+        data = await sync_to_async(lambda: serializer.data)()
+        return self.get_paginated_response(data)
+
+    def get_subscriptions(self, request):
+        recipes = Recipe.objects.all()[:get_recipes_limit(request)]
+        return Subscription.objects.filter(
+            user=request.user
+        ).select_related('author').annotate(
+            recipes_count=Coalesce('author__stats__recipes_count', 0)
+        ).prefetch_related(
+            Prefetch(
+                'author__recipe_set',
+                queryset=recipes,
+                to_attr='limited_recipes'
+            )
+        )
+
 
 class FavoriteRecipeViewSet(CreateOrDestroyViewSet):
     serializer_class = FavoriteRecipeSerializer
@@ -170,6 +370,7 @@ class FavoriteRecipeViewSet(CreateOrDestroyViewSet):
         context['recipe_id'] = self.kwargs.get('recipe_id')
         return context
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(
             user=self.request.user,
@@ -178,8 +379,10 @@ class FavoriteRecipeViewSet(CreateOrDestroyViewSet):
                 id=self.kwargs.get('recipe_id')
             )
         )
+        invalidate_user_flags(self.request)
 
     @action(methods=('delete',), detail=True)
+    @transaction.atomic
     def delete(self, request, recipe_id):
         u = request.user
         if not FavoriteRecipe.objects.filter(
@@ -191,6 +394,7 @@ class FavoriteRecipeViewSet(CreateOrDestroyViewSet):
             FavoriteRecipe,
             user=request.user,
             favorite_recipe_id=recipe_id).delete()
+        invalidate_user_flags(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -206,6 +410,7 @@ class ShoppingCartViewSet(CreateOrDestroyViewSet):
         context['recipe_id'] = self.kwargs.get('recipe_id')
         return context
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(
             user=self.request.user,
@@ -214,8 +419,10 @@ class ShoppingCartViewSet(CreateOrDestroyViewSet):
                 id=self.kwargs.get('recipe_id')
             )
         )
+        invalidate_user_flags(self.request)
 
     @action(methods=('delete',), detail=True)
+    @transaction.atomic
     def delete(self, request, recipe_id):
         u = request.user
         if not u.shopping_cart.select_related(
@@ -227,6 +434,7 @@ class ShoppingCartViewSet(CreateOrDestroyViewSet):
             ShoppingCart,
             user=request.user,
             recipe=recipe_id).delete()
+        invalidate_user_flags(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -241,6 +449,7 @@ class SubscribeViewSet(CreateOrDestroyViewSet):
         context['author_id'] = self.kwargs.get('user_id')
         return context
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(
             user=self.request.user,
@@ -249,8 +458,10 @@ class SubscribeViewSet(CreateOrDestroyViewSet):
                 id=self.kwargs.get('user_id')
             )
         )
+        invalidate_user_flags(self.request)
 
     @action(methods=('delete',), detail=True)
+    @transaction.atomic
     def unsubscribe(self, request, user_id):
         get_object_or_404(User, id=user_id)
         if not Subscription.objects.filter(
@@ -262,4 +473,5 @@ class SubscribeViewSet(CreateOrDestroyViewSet):
             user=request.user,
             author_id=user_id
         ).delete()
+        invalidate_user_flags(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
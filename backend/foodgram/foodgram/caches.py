@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """Кэш общий для всех воркеров: Redis, Memcached, файлы или база."""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
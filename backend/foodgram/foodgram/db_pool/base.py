@@ -0,0 +1,107 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+from foodgram.metrics import current_metrics
+
+from .pool import ConnectionPool, PoolTimeout
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(settings_dict, conn_params):
+    """Пул процесса для набора параметров подключения.
+
+    Тестовая и служебная базы получают свои пулы, пул родителя
+    после fork не используется.
+    """
+    key = repr(sorted(conn_params.items()))
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            options = settings_dict.get('POOL', {})
+            pool = pools[key] = ConnectionPool(
+                check=is_healthy,
+                reset=reset,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_idle=options.get('MAX_IDLE', 300),
+                check_interval=options.get('CHECK_INTERVAL', 5),
+            )
+        return pool
+
+
+def close_pools():
+    with pools_lock:
+        for pool in pools.values():
+            pool.close()
+        pools.clear()
+
+
+def is_healthy(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+def reset(connection):
+    """Откатывает незавершённую транзакцию перед возвратом в пул."""
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_IDLE:
+        return True
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    try:
+        connection.rollback()
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений на процесс.
+
+    Соединение берётся из пула в connect() и возвращается в close(),
+    поэтому CONN_MAX_AGE должен оставаться 0.
+    """
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        def connect():
+            return super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+
+        self.pool = get_pool(self.settings_dict, conn_params)
+        try:
+            connection, wait = self.pool.get(connect)
+        except PoolTimeout as error:
+            raise base.Database.OperationalError(str(error)) from error
+        self.pool.fill(connect)
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.add_pool_wait(wait)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
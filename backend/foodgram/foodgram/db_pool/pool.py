@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import deque
+from time import monotonic
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Пул DB-API соединений одного процесса.
+
+    Держит от min_size до max_size соединений, при выдаче проверяет
+    простоявшие дольше check_interval секунд (0 — при каждой выдаче),
+    а простаивающие дольше max_idle закрывает, пока соединений больше
+    min_size.
+    """
+
+    def __init__(self, check, reset, min_size=0, max_size=10,
+                 timeout=10, max_idle=300, check_interval=5):
+        self.check = check
+        self.reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+        self.idle = deque()
+        self.size = 0
+        self.condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.failed_checks = 0
+
+    def get(self, connect):
+        """Возвращает (соединение, время ожидания в секундах).
+
+        connect() открывает новое соединение, если свободных нет,
+        а лимит max_size не достигнут.
+        """
+        start = monotonic()
+        deadline = start + self.timeout
+        blocked = False
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    blocked = True
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'Нет свободного соединения за {self.timeout} с'
+                        )
+                    self.condition.wait(remaining)
+                if self.idle:
+                    connection, released = self.idle.pop()
+                else:
+                    self.size += 1
+                    connection = None
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    with self.condition:
+                        self.size -= 1
+                        self.condition.notify()
+                    raise
+                break
+            if (monotonic() - released < self.check_interval
+                    or self.check(connection)):
+                break
+            with self.condition:
+                self.failed_checks += 1
+                self.discard(connection)
+                self.condition.notify()
+        wait = monotonic() - start
+        with self.condition:
+            self.checkouts += 1
+            self.waits += blocked
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+        return connection, wait
+
+    def fill(self, connect):
+        """Открывает соединения, пока их меньше min_size."""
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            try:
+                connection = connect()
+            except BaseException:
+                with self.condition:
+                    self.size -= 1
+                raise
+            with self.condition:
+                self.idle.appendleft((connection, monotonic()))
+                self.condition.notify()
+
+    def put(self, connection):
+        if os.getpid() != self.pid:
+            # Соединение унаследовано от родителя после fork: сокет общий,
+            # закрывать его нельзя.
+            return
+        reusable = self.reset(connection)
+        now = monotonic()
+        with self.condition:
+            if reusable:
+                self.idle.append((connection, now))
+            else:
+                self.discard(connection)
+            while (self.idle and self.size > self.min_size
+                   and now - self.idle[0][1] > self.max_idle):
+                self.discard(self.idle.popleft()[0])
+            self.condition.notify()
+
+    def discard(self, connection):
+        self.size -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                self.discard(self.idle.pop()[0])
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_total': self.wait_total,
+                'wait_max': self.wait_max,
+                'timeouts': self.timeouts,
+                'failed_checks': self.failed_checks,
+            }
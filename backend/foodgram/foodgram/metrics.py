@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+# Счётчики текущего запроса (api.middleware.QueryMetrics). Пишут в них
+# middleware, потоки с запросами к базе и пул соединений.
+current_metrics = ContextVar('current_metrics', default=None)
+serializing = ContextVar('serializing', default=False)
+
+
+@contextmanager
+def serialization_timer():
+    """Время сериализации без SQL внутри неё; вложенные не считаются."""
+    metrics = current_metrics.get()
+    if metrics is None or serializing.get():
+        yield
+        return
+    token = serializing.set(True)
+    start, db_duration = perf_counter(), metrics.duration
+    try:
+        yield
+    finally:
+        serializing.reset(token)
+        metrics.add_serialization(
+            perf_counter() - start - (metrics.duration - db_duration)
+        )
@@ -0,0 +1,55 @@
+from contextvars import ContextVar
+from random import choice
+
+from django.conf import settings
+
+read_from_replica = ContextVar('read_from_replica', default=False)
+
+STICKY_COOKIE = 'db_primary'
+
+
+def stick_to_primary(request, response):
+    """После записи пользователь читает с основной базы, пока реплики
+    не догонят её.
+
+    Отметка хранится в подписанной cookie, поэтому её видят все
+    воркеры. В cookie записан id пользователя: после смены
+    токена в том же браузере отметка не действует.
+    """
+    response.set_signed_cookie(
+        STICKY_COOKIE, request.user.pk, salt=STICKY_COOKIE,
+        max_age=settings.DATABASE_REPLICA_STICKY_TIMEOUT,
+        secure=request.is_secure(), httponly=True, samesite='Lax',
+    )
+
+
+def is_sticky(request):
+    if not request.user.is_authenticated:
+        return False
+    user_id = request.get_signed_cookie(
+        STICKY_COOKIE, default=None, salt=STICKY_COOKIE,
+        max_age=settings.DATABASE_REPLICA_STICKY_TIMEOUT,
+    )
+    return user_id == str(request.user.pk)
+
+
+class ReplicaRouter:
+    """Чтения отмеченных запросов идут на случайную реплику.
+
+    Запрос отмечает ReplicaReadMixin, всё остальное, включая
+    записи и миграции, остаётся на основной базе.
+    """
+
+    def db_for_read(self, model, **hints):
+        if read_from_replica.get() and settings.DATABASE_REPLICAS:
+            return choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,17 +70,91 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
-DATABASES = {
+DATABASE_REPLICAS = []
+
+if os.getenv('DB_ENGINE') == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+    for number, path in enumerate(
+            filter(None, os.getenv('SQLITE_REPLICA_PATHS', '').split(',')),
+            start=1):
+        DATABASES[f'replica_{number}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+        }
+        DATABASE_REPLICAS.append(f'replica_{number}')
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
+            'USER': os.getenv('POSTGRES_USER', 'foodgram-user'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', 5432),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 0))
+    if DB_POOL_MAX_SIZE:
+        DATABASES['default'].update({
+            'ENGINE': 'foodgram.db_pool',
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 0)),
+                'MAX_SIZE': DB_POOL_MAX_SIZE,
+                'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'MAX_IDLE': int(os.getenv('DB_POOL_MAX_IDLE', 300)),
+                # SELECT 1 перед выдачей соединения, простоявшего дольше
+                # этого числа секунд; 0 — проверка при каждой выдаче.
+                'CHECK_INTERVAL': int(
+                    os.getenv('DB_POOL_CHECK_INTERVAL', 5)
+                ),
+            },
+        })
+    for number, host in enumerate(
+            filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')),
+            start=1):
+        host, _, port = host.partition(':')
+        DATABASES[f'replica_{number}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+
+DATABASE_REPLICA_STICKY_TIMEOUT = int(
+    os.getenv('DATABASE_REPLICA_STICKY_TIMEOUT', 10)
+)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
-        'USER': os.getenv('POSTGRES_USER', 'foodgram-user'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
-        'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+USER_FLAGS_CACHE_TIMEOUT = int(os.getenv('USER_FLAGS_CACHE_TIMEOUT', 300))
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_LOCAL_CACHE_TIMEOUT', 0)
+)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(
+    os.getenv('AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024)
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,10 +190,10 @@ MEDIA_ROOT = BASE_DIR / MEDIA_URL
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberOrCursorPagination',
     'PAGE_SIZE': 6,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -131,4 +207,89 @@ DJOSER = {
     'TOKEN_MODEL': 'rest_framework.authtoken.models.Token',
 }
 
+SHOPPING_LIST_CHUNK_SIZE = int(os.getenv('SHOPPING_LIST_CHUNK_SIZE', 500))
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE', 1280))
+RECIPE_THUMBNAILS = {
+    'list': ('300x200', {'crop': 'center', 'quality': 80}),
+    'card': ('600x400', {'crop': 'center', 'quality': 85}),
+    'detail': ('1200', {'upscale': False, 'quality': 85}),
+}
+
+INGREDIENTS_AUTOCOMPLETE_LIMIT = int(
+    os.getenv('INGREDIENTS_AUTOCOMPLETE_LIMIT', 20)
+)
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', 'russian')
+
+INGREDIENT_INDEX_CHUNK_SIZE = int(
+    os.getenv('INGREDIENT_INDEX_CHUNK_SIZE', 5000)
+)
+COOKABLE_RECIPES_LIMIT = int(os.getenv('COOKABLE_RECIPES_LIMIT', 30))
+INGREDIENT_INDEX_LOCAL_TIMEOUT = int(
+    os.getenv('INGREDIENT_INDEX_LOCAL_TIMEOUT', 30)
+)
+
+RECIPE_FEED_CACHE_TIMEOUT = int(os.getenv('RECIPE_FEED_CACHE_TIMEOUT', 300))
+REFERENCE_DATA_LOCAL_TIMEOUT = int(
+    os.getenv('REFERENCE_DATA_LOCAL_TIMEOUT', 10)
+)
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '') == 'true'
+ASYNC_QUERY_WORKERS = int(os.getenv('ASYNC_QUERY_WORKERS', 4))
+
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 10))
+# Замерено при холодных кэшах: токен, флаги пользователя, справочники
+# и индекс ингредиентов ещё не загружены. С тёплыми кэшами запросов
+# меньше. Потоковые ответы считаются вместе с генератором.
+QUERY_BUDGETS = {
+    'api:recipe-list': 13,
+    'api:recipe-list POST': 23,
+    'api:recipe-detail': 11,
+    'api:recipe-detail PATCH': 20,
+    'api:recipe-detail DELETE': 18,
+    'api:recipe-cookable': 8,
+    'api:recipe-download-shopping-cart': 2,
+    'api:tag-list': 3,
+    'api:tag-detail': 3,
+    'api:ingredient-list': 3,
+    'api:ingredient-detail': 3,
+    'api:favorite-list POST': 8,
+    'api:favorite-list DELETE': 8,
+    'api:shopping_cart-list POST': 8,
+    'api:shopping_cart-list DELETE': 8,
+    'api:user-list': 7,
+    'api:user-list POST': 5,
+    'api:user-set-password POST': 4,
+    'api:login POST': 4,
+    'api:logout POST': 3,
+    'api:user-detail': 6,
+    'api:user-me': 5,
+    'api:user-subscriptions': 8,
+    'api:subscribe-list POST': 14,
+    'api:subscribe-detail DELETE': 8,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            # INFO пишет строку на каждый запрос, WARNING — только
+            # превышения бюджета запросов.
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 CSRF_TRUSTED_ORIGINS = ['http://158.160.65.2:8000', 'https://*.ddns.net', 'http://yafoodgram16.ddns.net']
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from .models import (
-    Recipe, Tag, Ingredient,
+    AuthorStats, Recipe, Tag, Ingredient,
     RecipeIngredient, Subscription, FavoriteRecipe,
     ShoppingCart
 )
@@ -16,8 +16,10 @@ class RecipeIngredientInline(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = [
-        'author', 'name', 'image', 'text', 'cooking_time', 'pub_date'
+        'author', 'name', 'image', 'text', 'cooking_time', 'pub_date',
+        'favorites_count', 'shopping_cart_count'
     ]
+    readonly_fields = ['favorites_count', 'shopping_cart_count']
     inlines = [RecipeIngredientInline]
 
 
@@ -27,3 +29,4 @@ admin.site.register(Ingredient)
 admin.site.register(Subscription)
 admin.site.register(FavoriteRecipe)
 admin.site.register(ShoppingCart)
+admin.site.register(AuthorStats)
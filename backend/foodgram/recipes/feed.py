@@ -0,0 +1,24 @@
+from django.db.models import F
+
+from .models import FeedVersion
+
+FEED_VERSION_ID = 1
+
+
+def get_feed_versions():
+    """Версии рецептов и счётчиков: одна выборка по первичному ключу."""
+    versions = FeedVersion.objects.filter(
+        pk=FEED_VERSION_ID
+    ).values_list('recipes', 'counters').first()
+    return versions or (0, 0)
+
+
+def get_feed_version():
+    return get_feed_versions()[0]
+
+
+def bump_feed_version(field='recipes'):
+    versions = FeedVersion.objects.filter(pk=FEED_VERSION_ID)
+    if not versions.update(**{field: F(field) + 1}):
+        FeedVersion.objects.get_or_create(pk=FEED_VERSION_ID)
+        versions.update(**{field: F(field) + 1})
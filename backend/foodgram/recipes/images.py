@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .feed import bump_feed_version
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True},
+}
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        with executor_lock:
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=settings.RECIPE_IMAGE_WORKERS,
+                    thread_name_prefix='recipe-images'
+                )
+    return executor
+
+
+def schedule_renditions(recipe):
+    """Ставит пересжатие картинки в очередь после коммита транзакции."""
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    if not settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: build_renditions(recipe_id, image_name)
+        )
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(
+            run_in_worker, recipe_id, image_name
+        )
+    )
+
+
+def run_in_worker(recipe_id, image_name):
+    close_old_connections()
+    try:
+        build_renditions(recipe_id, image_name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку рецепта %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def render(image, options):
+    if options['format'] == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def build_thumbnails(recipe):
+    return {
+        size: get_thumbnail(recipe.image, geometry, **options).name
+        for size, (geometry, options) in settings.RECIPE_THUMBNAILS.items()
+    }
+
+
+def build_renditions(recipe_id, image_name):
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name).first()
+    if recipe is None:
+        return
+    storage = recipe.image.storage
+    with storage.open(image_name) as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(
+            (settings.RECIPE_IMAGE_MAX_SIZE, settings.RECIPE_IMAGE_MAX_SIZE)
+        )
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        renditions = {'source': image_name}
+        for extension, options in RENDITION_FORMATS.items():
+            renditions[extension] = storage.save(
+                f'recipes/renditions/{stem}.{extension}',
+                ContentFile(render(image, options))
+            )
+    renditions.update(build_thumbnails(recipe))
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_renditions=renditions, updated_at=timezone.now()
+    )
+    if updated:
+        bump_feed_version()
+    stale = recipe.image_renditions if updated else renditions
+    for extension in RENDITION_FORMATS:
+        if stale.get(extension):
+            storage.delete(stale[extension])
+    stale_source = stale.get('source')
+    if stale_source and (not updated or stale_source != image_name):
+        default.kvstore.delete_thumbnails(ImageFile(stale_source, storage))
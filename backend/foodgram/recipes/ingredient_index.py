@@ -0,0 +1,118 @@
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from foodgram.caches import is_shared_cache
+
+from .models import RecipeIngredient
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient_index_version'
+
+IngredientMatch = namedtuple(
+    'IngredientMatch', ('recipe_id', 'coverage', 'matched', 'total')
+)
+
+
+def get_version():
+    return cache.get_or_set(INGREDIENT_INDEX_VERSION_KEY, 0, None)
+
+
+def bump_version():
+    try:
+        return cache.incr(INGREDIENT_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.add(INGREDIENT_INDEX_VERSION_KEY, 0, None)
+        return None
+
+
+class IngredientIndex:
+    """Обратный индекс: id ингредиента -> id рецептов, где он нужен."""
+
+    def __init__(self, version):
+        self.version = version
+        self.built = time.monotonic()
+        self.recipes = defaultdict(set)
+        self.ingredients = defaultdict(set)
+        rows = RecipeIngredient.objects.using(
+            DEFAULT_DB_ALIAS
+        ).order_by().values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator(chunk_size=settings.INGREDIENT_INDEX_CHUNK_SIZE)
+        for recipe_id, ingredient_id in rows:
+            self.recipes[ingredient_id].add(recipe_id)
+            self.ingredients[recipe_id].add(ingredient_id)
+
+    def set_recipe(self, recipe_id, ingredient_ids):
+        for ingredient_id in self.ingredients.pop(recipe_id, ()):
+            self.recipes[ingredient_id].discard(recipe_id)
+        for ingredient_id in ingredient_ids:
+            self.recipes[ingredient_id].add(recipe_id)
+            self.ingredients[recipe_id].add(ingredient_id)
+
+    def search(self, ingredient_ids, limit):
+        """Рецепты по доле ингредиентов, которые уже есть у пользователя."""
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(self.recipes.get(ingredient_id, ()))
+        ranked = heapq.nlargest(limit, (
+            (count / len(self.ingredients[recipe_id]), count, recipe_id)
+            for recipe_id, count in matched.items()
+        ))
+        return [
+            IngredientMatch(
+                recipe_id, coverage, count, len(self.ingredients[recipe_id])
+            )
+            for coverage, count, recipe_id in ranked
+        ]
+
+
+class IngredientIndexCache:
+    """Индекс в памяти процесса.
+
+    Изменения рецептов этого процесса применяются к индексу на месте.
+    Если версию в общем кэше сдвинул кто-то ещё, индекс строится заново.
+    Без общего кэша чужие изменения не видны, поэтому индекс ещё и
+    перестраивается раз в INGREDIENT_INDEX_LOCAL_TIMEOUT секунд.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.lock = threading.Lock()
+
+    def is_fresh(self, index, version):
+        if index is None or index.version != version:
+            return False
+        return is_shared_cache() or (
+            time.monotonic() - index.built
+            < settings.INGREDIENT_INDEX_LOCAL_TIMEOUT
+        )
+
+    def search(self, ingredient_ids, limit):
+        version = get_version()
+        with self.lock:
+            if not self.is_fresh(self.index, version):
+                self.index = IngredientIndex(version)
+            return self.index.search(ingredient_ids, limit)
+
+    def recipe_changed(self, recipe_id):
+        version = bump_version()
+        ingredient_ids = list(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', flat=True))
+        with self.lock:
+            index = self.index
+            if index is None:
+                return
+            if version is None or index.version + 1 != version:
+                self.index = None
+                return
+            index.set_recipe(recipe_id, ingredient_ids)
+            index.version = version
+
+
+ingredient_index = IngredientIndexCache()
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт сжатые варианты и миниатюры для уже загруженных картинок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать варианты для всех рецептов'
+        )
+
+    def handle(self, *args, force, **options):
+        built = failed = 0
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'image_renditions'
+        )
+        for recipe in recipes.iterator():
+            missing = recipe.image_renditions.get(
+                'source'
+            ) != recipe.image.name or any(
+                variant not in recipe.image_renditions
+                for variant in settings.RECIPE_THUMBNAILS
+            )
+            if not (force or missing):
+                continue
+            try:
+                build_renditions(recipe.id, recipe.image.name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {built}, с ошибками: {failed}'
+        ))
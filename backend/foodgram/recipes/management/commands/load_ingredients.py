@@ -0,0 +1,78 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient
+from recipes.reference import bump_version
+
+DEFAULT_FILES = (
+    settings.BASE_DIR / 'data' / 'ingredients.csv',
+    settings.BASE_DIR / 'data' / 'ingredients.json',
+)
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        for row in csv.reader(csvfile, skipinitialspace=True):
+            if len(row) >= 2:
+                yield row[0], row[-1]
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as jsonfile:
+        for item in json.load(jsonfile):
+            yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV и JSON файлов без дубликатов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', default=DEFAULT_FILES,
+            help='Файлы .csv или .json, по умолчанию data/ingredients.*'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+
+    def read_ingredients(self, paths):
+        seen = set()
+        for path in paths:
+            reader = READERS.get(Path(path).suffix.lower())
+            if reader is None:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            for name, measurement_unit in reader(path):
+                key = (name.strip(), measurement_unit.strip())
+                if key[0] and key not in seen:
+                    seen.add(key)
+                    yield Ingredient(name=key[0], measurement_unit=key[1])
+
+    def handle(self, *args, paths, batch_size, **options):
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        ingredients = self.read_ingredients(paths)
+        total = 0
+        while batch := list(islice(ingredients, batch_size)):
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        created = Ingredient.objects.count() - before
+        bump_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {total}, добавлено: {created}, '
+            f'уже было: {total - created}, '
+            f'{elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import (
+    AuthorStats, FavoriteRecipe, Recipe, ShoppingCart, Subscription
+)
+
+User = get_user_model()
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного, списков покупок и авторов'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_subquery(
+                FavoriteRecipe.objects.all(), 'favorite_recipe'
+            ),
+            shopping_cart_count=count_subquery(
+                ShoppingCart.objects.all(), 'recipe'
+            ),
+        )
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=pk)
+             for pk in User.objects.values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        authors = AuthorStats.objects.update(
+            recipes_count=count_subquery(Recipe.objects.all(), 'author'),
+            subscribers_count=count_subquery(
+                Subscription.objects.all(), 'author'
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes}, авторов: {authors}'
+        ))
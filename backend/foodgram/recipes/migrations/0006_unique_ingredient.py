@@ -0,0 +1,45 @@
+# Generated by Django 4.2.4 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    kept = {}
+    for ingredient in Ingredient.objects.order_by('id'):
+        key = (ingredient.name, ingredient.measurement_unit)
+        if key not in kept:
+            kept[key] = ingredient.id
+            continue
+        original_id = kept[key]
+        duplicates = RecipeIngredient.objects.filter(ingredient=ingredient)
+        duplicates.filter(
+            recipe__in=RecipeIngredient.objects.filter(
+                ingredient_id=original_id
+            ).values('recipe')
+        ).delete()
+        duplicates.update(ingredient_id=original_id)
+        ingredient.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='amount',
+            field=models.PositiveIntegerField(default=1, verbose_name='Количество'),
+        ),
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.4 on 2026-10-18 06:09
+
+from django.db import migrations, models
+
+
+def remove_duplicate_favorites(apps, schema_editor):
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    duplicates = (
+        FavoriteRecipe.objects.values('user', 'favorite_recipe')
+        .annotate(first_id=models.Min('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        FavoriteRecipe.objects.filter(
+            user_id=duplicate['user'],
+            favorite_recipe_id=duplicate['favorite_recipe'],
+        ).exclude(id=duplicate['first_id']).delete()
+        Recipe.objects.filter(id=duplicate['favorite_recipe']).update(
+            favorites_count=FavoriteRecipe.objects.filter(
+                favorite_recipe_id=duplicate['favorite_recipe']
+            ).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_favorites, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'favorite_recipe'), name='unique_favorite_recipe'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id);',
+            'DROP INDEX recipe_tags_tag_recipe_idx;',
+        ),
+    ]
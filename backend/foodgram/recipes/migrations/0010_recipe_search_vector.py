@@ -0,0 +1,63 @@
+# Generated by Django 4.2.4 on 2026-10-18 06:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'], name='recipe_search_vector_idx'
+)
+
+FILL_SEARCH_VECTOR = '''
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, coalesce(recipes_recipe.name, '')), 'A')
+    || setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(recipes_ingredient.name, ' ')
+        FROM recipes_recipeingredient
+        JOIN recipes_ingredient
+            ON recipes_ingredient.id = recipes_recipeingredient.ingredient_id
+        WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector(%(config)s::regconfig, coalesce(recipes_recipe.text, '')), 'C');
+'''
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('recipes', 'Recipe'), SEARCH_INDEX)
+    schema_editor.execute(
+        FILL_SEARCH_VECTOR, {'config': settings.RECIPE_SEARCH_CONFIG}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(
+        apps.get_model('recipes', 'Recipe'), SEARCH_INDEX
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_favorite_unique_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
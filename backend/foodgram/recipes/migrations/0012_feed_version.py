@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+def create_feed_version(apps, schema_editor):
+    FeedVersion = apps.get_model('recipes', 'FeedVersion')
+    FeedVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='flags_version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Версия избранного, покупок и подписок'),
+        ),
+        migrations.CreateModel(
+            name='FeedVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipes', models.PositiveBigIntegerField(default=0, verbose_name='Версия рецептов')),
+                ('counters', models.PositiveBigIntegerField(default=0, verbose_name='Версия счётчиков')),
+            ],
+            options={
+                'verbose_name': 'Версия ленты',
+                'verbose_name_plural': 'Версии ленты',
+            },
+        ),
+        migrations.RunPython(create_feed_version, migrations.RunPython.noop),
+    ]
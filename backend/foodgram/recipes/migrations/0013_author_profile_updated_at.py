@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feed_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='profile_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата изменения профиля'),
+        ),
+    ]
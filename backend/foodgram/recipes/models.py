@@ -1,4 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField
+)
+from django.db import connections, models
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Value
 from django.utils.text import slugify
 from django.core.validators import RegexValidator
 from django.contrib.auth import get_user_model
@@ -8,7 +15,9 @@ User = get_user_model()
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=100, verbose_name='Название')
-    amount = models.PositiveIntegerField(verbose_name='Количество')
+    amount = models.PositiveIntegerField(
+        default=1, verbose_name='Количество'
+    )
     measurement_unit = models.CharField(
         max_length=20, verbose_name='Единица измерения'
     )
@@ -17,6 +26,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -46,6 +61,65 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                is_subscribed_to_author=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, favorite_recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_subscribed_to_author=Exists(Subscription.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+    def is_postgresql(self):
+        return connections[self.db].vendor == 'postgresql'
+
+    def update_search_vector(self):
+        if not self.is_postgresql():
+            return 0
+        config = settings.RECIPE_SEARCH_CONFIG
+        ingredient_names = RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(
+                Subquery(ingredient_names), weight='B', config=config
+            )
+            + SearchVector('text', weight='C', config=config)
+        ))
+
+    def search(self, query):
+        if not self.is_postgresql():
+            return self.filter(
+                Q(name__icontains=query)
+                | Q(text__icontains=query)
+                | Exists(RecipeIngredient.objects.filter(
+                    recipe=OuterRef('pk'), ingredient__name__icontains=query
+                ))
+            ).annotate(rank=Value(1.0))
+        search_query = SearchQuery(
+            query, config=settings.RECIPE_SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return self.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -56,6 +130,12 @@ class Recipe(models.Model):
         'Картинка',
         upload_to='recipes/'
     )
+    image_renditions = models.JSONField(
+        'Сжатые варианты картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -68,14 +148,82 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации рецепта',
         auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения рецепта',
+        auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0)
+    shopping_cart_count = models.PositiveIntegerField(
+        'Добавлений в список покупок',
+        default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0)
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0)
+    flags_version = models.PositiveBigIntegerField(
+        'Версия избранного, покупок и подписок',
+        default=0)
+    profile_updated_at = models.DateTimeField(
+        'Дата изменения профиля',
+        null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.user}'
+
+
+class FeedVersion(models.Model):
+    """Версии ленты рецептов, одна строка на всю базу.
+
+    recipes растёт после изменения рецептов и их авторов,
+    counters — после изменения счётчиков избранного и покупок.
+    """
+    recipes = models.PositiveBigIntegerField('Версия рецептов', default=0)
+    counters = models.PositiveBigIntegerField('Версия счётчиков', default=0)
+
+    class Meta:
+        verbose_name = 'Версия ленты'
+        verbose_name_plural = 'Версии ленты'
+
+    def __str__(self):
+        return f'Лента {self.recipes}.{self.counters}'
+
+
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe,
@@ -130,6 +278,14 @@ class FavoriteRecipe(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'favorite_recipe'),
+                name='unique_favorite_recipe'
+            )
+        ]
+
     def __str__(self):
         return (
             f'Пользователь: {self.user.username}'
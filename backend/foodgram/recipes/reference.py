@@ -0,0 +1,135 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from foodgram.caches import is_shared_cache
+
+from .models import Ingredient, Tag
+
+REFERENCE_VERSION_KEY = 'reference_data_version'
+REFERENCE_MODIFIED_KEY = 'reference_data_modified'
+
+TagRecord = namedtuple('TagRecord', ('id', 'name', 'color', 'slug'))
+IngredientRecord = namedtuple(
+    'IngredientRecord', ('id', 'name', 'measurement_unit', 'amount')
+)
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+def get_version():
+    return cache.get_or_set(
+        REFERENCE_VERSION_KEY, lambda: uuid4().hex, None
+    )
+
+
+def get_last_modified():
+    return cache.get_or_set(REFERENCE_MODIFIED_KEY, time.time, None)
+
+
+def bump_version():
+    cache.set_many({
+        REFERENCE_VERSION_KEY: uuid4().hex,
+        REFERENCE_MODIFIED_KEY: time.time(),
+    }, None)
+
+
+class ReferenceData:
+    """Неизменяемый снимок тегов и ингредиентов с доступом по id.
+
+    Читается с основной базы. digest считается по содержимому и
+    одинаков у всех воркеров с одинаковыми данными.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.built = time.monotonic()
+        self.tag_list = tuple(
+            TagRecord(*row) for row in Tag.objects.using(
+                DEFAULT_DB_ALIAS
+            ).values_list(
+                'id', 'name', 'color', 'slug'
+            )
+        )
+        self.tags = {tag.id: tag for tag in self.tag_list}
+        self.ingredient_list = tuple(
+            IngredientRecord(*row)
+            for row in Ingredient.objects.using(DEFAULT_DB_ALIAS).values_list(
+                'id', 'name', 'measurement_unit', 'amount'
+            )
+        )
+        self.ingredients = {
+            ingredient.id: ingredient for ingredient in self.ingredient_list
+        }
+        self.digest = md5(
+            repr((self.tag_list, self.ingredient_list)).encode()
+        ).hexdigest()
+        self.ingredient_names = sorted(
+            (normalize(ingredient.name), ingredient.id)
+            for ingredient in self.ingredient_list
+        )
+
+    def search_ingredients(self, query, limit):
+        """Сначала совпадения по началу названия, затем по вхождению."""
+        query = normalize(query)
+        names = self.ingredient_names
+        start = bisect_left(names, (query,))
+        result = []
+        for position in range(start, len(names)):
+            name, pk = names[position]
+            if len(result) >= limit or not name.startswith(query):
+                break
+            result.append(self.ingredients[pk])
+        for name, pk in names:
+            if len(result) >= limit:
+                break
+            if query in name and not name.startswith(query):
+                result.append(self.ingredients[pk])
+        return result
+
+
+class ReferenceCache:
+    """Снимок справочников в памяти процесса.
+
+    Перестраивается, когда в общем кэше меняется версия справочников.
+    Без общего кэша версию меняет только свой процесс, поэтому снимок
+    ещё и перечитывается раз в REFERENCE_DATA_LOCAL_TIMEOUT секунд.
+    """
+
+    def __init__(self):
+        self.data = None
+        self.lock = threading.Lock()
+
+    def is_fresh(self, data, version):
+        if data is None or data.version != version:
+            return False
+        return is_shared_cache() or (
+            time.monotonic() - data.built
+            < settings.REFERENCE_DATA_LOCAL_TIMEOUT
+        )
+
+    def get(self):
+        version = get_version()
+        data = self.data
+        if not self.is_fresh(data, version):
+            with self.lock:
+                data = self.data
+                if not self.is_fresh(data, version):
+                    data = self.data = ReferenceData(version)
+        return data
+
+
+reference_cache = ReferenceCache()
+
+
+def get_reference_data():
+    return reference_cache.get()
@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    AuthorStats, FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
+    Subscription, Tag
+)
+from .feed import bump_feed_version
+from .images import schedule_renditions
+from .ingredient_index import ingredient_index
+from .reference import bump_version
+
+
+def change_counter(queryset, field, delta):
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def change_author_stats(user_id, field, delta):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if not change_counter(stats, field, delta):
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        change_counter(stats, field, delta)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    if (instance.image
+            and instance.image_renditions.get('source')
+            != instance.image.name):
+        schedule_renditions(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    recipe_id = instance.pk
+
+    def update_indexes():
+        Recipe.objects.filter(pk=recipe_id).update_search_vector()
+        ingredient_index.recipe_changed(recipe_id)
+        bump_feed_version()
+
+    transaction.on_commit(update_indexes)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(
+        AuthorStats.objects.filter(user_id=instance.author_id),
+        'recipes_count', -1
+    )
+    recipe_id = instance.pk
+
+    def update_indexes():
+        ingredient_index.recipe_changed(recipe_id)
+        bump_feed_version()
+
+    transaction.on_commit(update_indexes)
+
+
+@receiver(post_save, sender=get_user_model())
+def author_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    # Рецепт показывает автора: его ETag следит за датой профиля.
+    if AuthorStats.objects.filter(
+            user=instance, recipes_count__gt=0
+    ).update(profile_updated_at=timezone.now()):
+        transaction.on_commit(bump_feed_version)
+
+
+def change_recipe_counter(recipe_id, field, delta):
+    change_counter(Recipe.objects.filter(pk=recipe_id), field, delta)
+    transaction.on_commit(lambda: bump_feed_version('counters'))
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def user_flags_changed(sender, instance, created=True, **kwargs):
+    """Новая версия флагов меняет ключ их кэша и ETag ленты."""
+    if created:
+        change_author_stats(instance.user_id, 'flags_version', 1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(
+            instance.favorite_recipe_id, 'favorites_count', 1
+        )
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_deleted(sender, instance, **kwargs):
+    change_recipe_counter(instance.favorite_recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    change_recipe_counter(instance.recipe_id, 'shopping_cart_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, 'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change_counter(
+        AuthorStats.objects.filter(user_id=instance.author_id),
+        'subscribers_count', -1
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reference_data_changed(sender, **kwargs):
+    # Второй сброс после коммита: до него другой воркер мог собрать
+    # снимок из старых строк под новой версией.
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(
+            ingredients=instance
+        ).update_search_vector()